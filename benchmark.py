@@ -0,0 +1,282 @@
+# coding: utf-8
+u'''
+Micro benchmarks for the hot paths of serialize.py.
+
+    $ python benchmark.py
+'''
+
+import sys
+import json
+import timeit
+
+from multiprocessing import cpu_count
+
+from serialize import (AttrObject, OptionalAttr, ChoiceAttr,
+                       SignatureDictAttr, SlottedAttrObject,
+                       TrackedAttrObject, FrozenAttrObject)
+
+
+class Point(AttrObject):
+    attributes = {
+        "x": int,
+        "y": int,
+        "label": OptionalAttr(unicode, default=u""),
+        "weight": float,
+    }
+
+
+class Shape(AttrObject):
+    attributes = {
+        "name": unicode,
+        "kind": ChoiceAttr(["polygon", "polyline"]),
+        "points": [Point],
+    }
+
+
+class TrackedShape(TrackedAttrObject):
+    attributes = Shape.raw_attributes
+
+
+class FrozenShape(FrozenAttrObject):
+    attributes = Shape.raw_attributes
+
+
+TEN_FIELDS = dict(("field%d" % i, int) for i in range(10))
+
+
+class Record(AttrObject):
+    attributes = TEN_FIELDS
+
+
+class SlottedRecord(SlottedAttrObject):
+    attributes = TEN_FIELDS
+
+
+FLAT = {"x": 1, "y": 2, "label": u"p", "weight": 0.5}
+NESTED = {
+    "name": u"triangle",
+    "kind": "polygon",
+    "points": [dict(FLAT, x=i) for i in range(10)],
+}
+
+
+def _signature_dict_attr(cls):
+    return SignatureDictAttr(signature=cls.type_signature(),
+                             __bootstrap__=True)
+
+
+class PlainPoint(object):
+    def __init__(self, x, y, weight, label=u""):
+        self.x = x
+        self.y = y
+        self.weight = weight
+        self.label = label
+
+
+def count_allocations(func):
+    u'func 한 번의 호출 동안 생성된 AttrObject(Attr 포함) 인스턴스의 수.'
+    counter = [0]
+
+    def counting_new(cls, *args, **kwds):
+        counter[0] += 1
+        return object.__new__(cls)
+
+    AttrObject.__new__ = staticmethod(counting_new)
+    try:
+        func()
+    finally:
+        del AttrObject.__new__
+    return counter[0]
+
+
+def report(title, func, number):
+    best = min(timeit.repeat(func, repeat=3, number=number))
+    print "%-40s %8.2f us/call" % (title, best / number * 1e6)
+    return best
+
+
+def bench_loads():
+    for cls, dict_, number in [(Point, FLAT, 20000), (Shape, NESTED, 2000)]:
+        sig_attr = _signature_dict_attr(cls)
+        generic = report("%s generic loads" % cls.__name__,
+                         lambda: sig_attr.loads(dict_, "object"), number)
+        compiled = report("%s compiled loads" % cls.__name__,
+                          lambda: cls._get_compiled_loader("object")(dict_),
+                          number)
+        print "%-40s %8.2fx" % ("speedup", generic / compiled)
+        report("%s.loads_dict" % cls.__name__,
+               lambda: cls.loads_dict(dict_), number)
+
+
+def bench_dumps():
+    for cls, dict_, number in [(Point, FLAT, 20000), (Shape, NESTED, 2000)]:
+        obj = cls.loads_dict(dict_)
+        sig_attr = _signature_dict_attr(cls)
+        for env_type in ["object", "json"]:
+            generic = report("%s generic dumps (%s)" % (cls.__name__, env_type),
+                             lambda: sig_attr.dumps(obj.shallow_dict(), env_type),
+                             number)
+            compiled = report("%s compiled dumps (%s)" % (cls.__name__, env_type),
+                              lambda: cls._get_compiled_dumper(env_type)(obj),
+                              number)
+            print "%-40s %8.2fx" % ("speedup", generic / compiled)
+        report("%s.dumps_dict" % cls.__name__, obj.dumps_dict, number)
+
+
+def bench_many():
+    rows = [dict(FLAT, x=i) for i in range(1000)]
+    loop = report("Point.loads_dict loop (1000 rows)",
+                  lambda: [Point.loads_dict(row) for row in rows], 20)
+    many = report("Point.loads_many (1000 rows)",
+                  lambda: Point.loads_many(rows), 20)
+    print "%-40s %8.2fx" % ("speedup", loop / many)
+    points = Point.loads_many(rows)
+    report("Point.dumps_many (1000 rows)",
+           lambda: Point.dumps_many(points), 20)
+
+
+def bench_parallel():
+    lines = [json.dumps(dict(FLAT, x=i)) for i in range(50000)]
+    serial = report("Point.loads_many_parallel (1 worker)",
+                    lambda: Point.loads_many_parallel(lines, workers=1,
+                                                      raw_json=True), 1)
+    parallel = report("Point.loads_many_parallel (%d workers)" % cpu_count(),
+                      lambda: Point.loads_many_parallel(lines, raw_json=True),
+                      1)
+    print "%-40s %8.2fx" % ("speedup", serial / parallel)
+
+
+def bench_columns():
+    try:
+        import numpy
+    except ImportError:
+        print "%-40s %s" % ("to_columns", "skipped (no NumPy)")
+        return
+    records = [SlottedRecord(**dict((key, n) for key in TEN_FIELDS))
+               for n in range(10000)]
+    keys = sorted(SlottedRecord.type_signature())
+    report("manual transpose (10000 rows)",
+           lambda: dict((key, numpy.array([getattr(r, key) for r in records]))
+                        for key in keys), 5)
+    report("SlottedRecord.to_columns (10000 rows)",
+           lambda: SlottedRecord.to_columns(records), 5)
+    columns = SlottedRecord.to_columns(records)
+    dicts = [record.dumps_dict() for record in records]
+    report("SlottedRecord.loads_many (10000 rows)",
+           lambda: SlottedRecord.loads_many(dicts), 5)
+    report("SlottedRecord.from_columns (10000 rows)",
+           lambda: SlottedRecord.from_columns(columns), 5)
+
+
+def bench_binary():
+    for cls, dict_, number in [(Point, FLAT, 20000), (Shape, NESTED, 2000)]:
+        obj = cls.loads_dict(dict_)
+        data, text = obj.dumps_binary(), obj.dumps_json()
+        print "%-40s %8d / %d bytes" % ("%s binary / json size" % cls.__name__,
+                                        len(data), len(text))
+        report("%s.dumps_binary" % cls.__name__, obj.dumps_binary, number)
+        report("%s.dumps_json" % cls.__name__, obj.dumps_json, number)
+        report("%s.loads_binary" % cls.__name__,
+               lambda: cls.loads_binary(data), number)
+        report("%s.loads_json" % cls.__name__,
+               lambda: cls.loads_json(text), number)
+
+
+def bench_lazy():
+    drawing = {"name": u"drawing", "kind": "polygon",
+               "points": [dict(FLAT, x=i) for i in range(1000)]}
+    report("Shape.loads_dict (1000 points)",
+           lambda: Shape.loads_dict(drawing).name, 200)
+    report("Shape.loads_lazy, one field read",
+           lambda: Shape.loads_lazy(drawing).name, 200)
+
+
+def bench_tracked():
+    drawing = {"name": u"drawing", "kind": "polygon",
+               "points": [dict(FLAT, x=i) for i in range(1000)]}
+    shape = Shape.loads_dict(drawing)
+    tracked = TrackedShape.loads_dict(drawing)
+    tracked.dumps_dict()
+    def rename(obj):
+        obj.name = u"renamed"
+        return obj.dumps_dict()
+    report("Shape.dumps_dict after a rename (1000 points)",
+           lambda: rename(shape), 200)
+    report("TrackedShape.dumps_dict after a rename (1000 points)",
+           lambda: rename(tracked), 200)
+
+
+def bench_frozen():
+    shape = Shape.loads_dict(NESTED)
+    frozen = FrozenShape.loads_dict(NESTED)
+    report("Shape.dumps_json (10 points)", shape.dumps_json, 2000)
+    report("FrozenShape.dumps_json (10 points)", frozen.dumps_json, 2000)
+    report("hash(FrozenShape)", lambda: hash(frozen), 2000)
+
+
+def string_bytes(shapes):
+    u'shapes가 참조하는 서로 다른 unicode 객체들의 크기 합.'
+    seen = {}
+    for shape in shapes:
+        for value in [shape.name] + [point.label for point in shape.points]:
+            seen[id(value)] = sys.getsizeof(value)
+    return sum(seen.values())
+
+
+def bench_interning():
+    batch = json.dumps([NESTED] * 100)
+    report("Shape.loads_many (100 shapes)",
+           lambda: Shape.loads_many(json.loads(batch)), 20)
+    report("Shape.loads_many, interner=True",
+           lambda: Shape.loads_many(json.loads(batch), interner=True), 20)
+    for interner in [None, True]:
+        shapes = Shape.loads_many(json.loads(batch), interner=interner)
+        print "%-40s %8d bytes of strings" % (
+            "interner=%s" % interner, string_bytes(shapes))
+
+
+def bench_allocations():
+    point = Point.loads_dict(FLAT)
+    for title, func in [("Point.loads_dict", lambda: Point.loads_dict(FLAT)),
+                        ("Point.dumps_dict", point.dumps_dict),
+                        ("Point(...)", lambda: Point(**FLAT))]:
+        func()
+        print "%-40s %8d objects/call" % (title, count_allocations(func))
+
+
+def bench_construction():
+    number = 20000
+    report("PlainPoint(...)", lambda: PlainPoint(**FLAT), number)
+    report("Point(...)", lambda: Point(**FLAT), number)
+    report("Point(__raw__=True, ...)",
+           lambda: Point(__raw__=True, **FLAT), number)
+
+
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def bench_memory():
+    values = dict(("field%d" % i, i) for i in range(10))
+    for cls in [Record, SlottedRecord]:
+        print "%-40s %8d bytes/instance" % (
+            cls.__name__, instance_size(cls.loads_dict(values)))
+
+
+if __name__ == '__main__':
+    bench_loads()
+    bench_dumps()
+    bench_many()
+    bench_parallel()
+    bench_columns()
+    bench_binary()
+    bench_lazy()
+    bench_tracked()
+    bench_frozen()
+    bench_interning()
+    bench_allocations()
+    bench_construction()
+    bench_memory()
@@ -0,0 +1,348 @@
+# coding: utf-8
+u'''
+type_signature()를 이용한 compact binary format.
+
+An object is written as a presence bitmap for its OptionalAttr/NoneableAttr
+fields followed by the present fields, positionally in sorted key order:
+
+    IntegerAttr      zigzag varint
+    FloatAttr        8-byte little-endian double
+    bool             1 byte
+    UnicodeAttr      varint length + UTF-8
+    BytesAttr        varint length + raw bytes
+    ChoiceAttr       varint index into choices
+    ListAttr         varint count + items
+    AttrObject       nested object; AbstractAttrObject values are prefixed
+                     with varint length + JSON of their type value
+    anything else    varint length + JSON of attr.dumps(value, "json")
+
+Field order follows the schema, so both sides must share the same class
+definitions. Type values are written as they are, so defining new
+subclasses later does not change how existing payloads decode.
+'''
+
+import json
+import struct
+
+from serialize import (Attr, AbstractAttrObject, IntegerAttr, FloatAttr,
+                       SimpleTypeAttr, BytesAttr, UnicodeAttr, ChoiceAttr,
+                       StringChoiceAttr, ListAttr, OptionalAttr, NoneableAttr,
+                       AttrObjectAdapter, LoadFailedError, DumpFailedError,
+                       MappingFailedError)
+
+
+_double = struct.Struct("<d")
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append(chr(0x80 | (n & 0x7f)))
+        n >>= 7
+    out.append(chr(n))
+
+
+def read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = ord(buf[pos])
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read(buf, pos, size):
+    end = pos + size
+    if end > len(buf):
+        raise IndexError
+    return buf[pos:end], end
+
+
+_codec_rules = {}
+
+def codec_rule(*attr_classes):
+    u'''
+    attr -> (encode, decode) 함수를 등록한다.
+    encode(value, out) appends byte strings to the list out;
+    decode(buf, pos) returns (value, new_pos). A rule may return None to use
+    the JSON codec.
+    '''
+    def decorator(fn):
+        for attr_cls in attr_classes:
+            _codec_rules[attr_cls] = fn
+        return fn
+    return decorator
+
+
+def codec(attr):
+    attr = Attr.coerce(attr)
+    rule = _codec_rules.get(type(attr))
+    if rule is not None:
+        result = rule(attr)
+        if result is not None:
+            return result
+    return json_codec(attr)
+
+
+def json_codec(attr):
+    def encode(value, out):
+        data = json.dumps(attr.dumps(value, "json"))
+        write_varint(out, len(data))
+        out.append(data)
+    def decode(buf, pos):
+        size, pos = read_varint(buf, pos)
+        data, pos = _read(buf, pos, size)
+        try:
+            json_value = json.loads(data)
+        except ValueError as exc:
+            raise LoadFailedError("Invalid JSON: %s" % exc)
+        return attr.loads(json_value, "json"), pos
+    return encode, decode
+
+
+def _type_mismatch(value, types):
+    return DumpFailedError("Type Mismatch: %s doesn't match with types (%s)"
+                           % (repr(value), ", ".join(t.__name__ for t in types)))
+
+
+@codec_rule(IntegerAttr)
+def integer_codec_rule(attr):
+    def encode(value, out):
+        if not isinstance(value, (int, long)):
+            raise _type_mismatch(value, (int, long))
+        write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+    def decode(buf, pos):
+        n, pos = read_varint(buf, pos)
+        return (-((n + 1) >> 1) if n & 1 else n >> 1), pos
+    return encode, decode
+
+
+@codec_rule(FloatAttr)
+def float_codec_rule(attr):
+    def encode(value, out):
+        if not isinstance(value, (int, long, float)):
+            raise _type_mismatch(value, (int, long, float))
+        out.append(_double.pack(value))
+    def decode(buf, pos):
+        if pos + 8 > len(buf):
+            raise IndexError
+        return _double.unpack_from(buf, pos)[0], pos + 8
+    return encode, decode
+
+
+@codec_rule(SimpleTypeAttr)
+def simple_type_codec_rule(attr):
+    if attr.types == (bool, ):
+        def encode(value, out):
+            if not isinstance(value, bool):
+                raise _type_mismatch(value, (bool, ))
+            out.append("\x01" if value else "\x00")
+        def decode(buf, pos):
+            return buf[pos] != "\x00", pos + 1
+        return encode, decode
+    if attr.types in ((int, ), (int, long)):
+        return integer_codec_rule(attr)
+
+
+def _string_codec(attr, to_bytes, from_bytes):
+    def encode(value, out):
+        if not isinstance(value, basestring):
+            raise _type_mismatch(value, (bytes, unicode))
+        data = to_bytes(value)
+        write_varint(out, len(data))
+        out.append(data)
+    def decode(buf, pos):
+        size, pos = read_varint(buf, pos)
+        data, pos = _read(buf, pos, size)
+        try:
+            return from_bytes(data), pos
+        except UnicodeError as exc:
+            raise LoadFailedError(str(exc))
+    return encode, decode
+
+
+@codec_rule(UnicodeAttr)
+def unicode_codec_rule(attr):
+    def to_bytes(value):
+        if isinstance(value, bytes):
+            value = value.decode(attr.encoding)
+        return value.encode("utf-8")
+    return _string_codec(attr, to_bytes, lambda data: data.decode("utf-8"))
+
+
+@codec_rule(BytesAttr)
+def bytes_codec_rule(attr):
+    def to_bytes(value):
+        if isinstance(value, unicode):
+            value = value.encode(attr.encoding)
+        return value
+    return _string_codec(attr, to_bytes, lambda data: data)
+
+
+@codec_rule(ChoiceAttr, StringChoiceAttr)
+def choice_codec_rule(attr):
+    choices = list(attr.choices)
+    def encode(value, out):
+        try:
+            write_varint(out, choices.index(value))
+        except ValueError:
+            raise DumpFailedError("%s doesn't matched with choices: %s"
+                                  % (repr(value), ", ".join(map(repr, choices))))
+    def decode(buf, pos):
+        idx, pos = read_varint(buf, pos)
+        if idx >= len(choices):
+            raise LoadFailedError("Choice index %d out of range" % idx)
+        return choices[idx], pos
+    return encode, decode
+
+
+@codec_rule(ListAttr)
+def list_codec_rule(attr):
+    if len(attr.attrs) != 1:
+        return None
+    encode_item, decode_item = codec(attr.attrs[0])
+    def encode(value, out):
+        if isinstance(value, basestring) or not hasattr(value, "__iter__"):
+            raise DumpFailedError("Iterable expected, got %s" % repr(value))
+        value = list(value)
+        write_varint(out, len(value))
+        for idx, item in enumerate(value):
+            try:
+                encode_item(item, out)
+            except MappingFailedError as exc:
+                exc.wrap_with_scope(u"[%d]" % idx)
+                raise
+    def decode(buf, pos):
+        size, pos = read_varint(buf, pos)
+        result = []
+        for idx in xrange(size):
+            try:
+                item, pos = decode_item(buf, pos)
+            except MappingFailedError as exc:
+                exc.wrap_with_scope(u"[%d]" % idx)
+                raise
+            result.append(item)
+        return result, pos
+    return encode, decode
+
+
+@codec_rule(AttrObjectAdapter)
+def attrobj_codec_rule(attr):
+    attrobj_cls = attr.attrobj_cls
+    def encode(value, out):
+        encode_object(attrobj_cls, value, out)
+    def decode(buf, pos):
+        return decode_object(attrobj_cls, buf, pos)
+    return encode, decode
+
+
+_plans = {}
+
+def _plan(attrobj_cls):
+    u'(key, attr, optional 여부, (encode, decode)) 의 list와 bitmap 크기.'
+    try:
+        return _plans[attrobj_cls]
+    except KeyError:
+        pass
+    signature = attrobj_cls.type_signature()
+    fields = []
+    num_optional = 0
+    for key in sorted(signature):
+        attr = signature[key]
+        if isinstance(attr, (OptionalAttr, NoneableAttr)):
+            fields.append((key, attr, True, codec(attr.wrapped_attr)))
+            num_optional += 1
+        else:
+            fields.append((key, attr, False, codec(attr)))
+    plan = _plans[attrobj_cls] = fields, (num_optional + 7) // 8
+    return plan
+
+
+def encode_object(attrobj_cls, obj, out):
+    if not isinstance(obj, attrobj_cls):
+        raise DumpFailedError('Expected an instance of %s, got %s'
+                              % (repr(attrobj_cls), repr(obj)))
+    if issubclass(attrobj_cls, AbstractAttrObject):
+        attrobj_cls = type(obj)
+        data = json.dumps(attrobj_cls._get_type_value())
+        write_varint(out, len(data))
+        out.append(data)
+
+    fields, bitmap_size = _plan(attrobj_cls)
+    body = []
+    bits = 0
+    bit = 1
+    for key, attr, optional, (encode, _) in fields:
+        value = getattr(obj, key)
+        if optional:
+            present = value is not None
+            if present:
+                bits |= bit
+            bit <<= 1
+            if not present:
+                continue
+        try:
+            encode(value, body)
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(key)
+            raise
+    for _ in xrange(bitmap_size):
+        out.append(chr(bits & 0xff))
+        bits >>= 8
+    out.extend(body)
+
+
+def decode_object(attrobj_cls, buf, pos):
+    if issubclass(attrobj_cls, AbstractAttrObject):
+        size, pos = read_varint(buf, pos)
+        data, pos = _read(buf, pos, size)
+        try:
+            type_value = json.loads(data)
+        except ValueError as exc:
+            raise LoadFailedError("Invalid type value: %s" % exc)
+        attrobj_cls = attrobj_cls.guess_class({attrobj_cls.type_key: type_value})
+
+    fields, bitmap_size = _plan(attrobj_cls)
+    bitmap, pos = _read(buf, pos, bitmap_size)
+    bits = 0
+    for byte in reversed(bitmap):
+        bits = (bits << 8) | ord(byte)
+    kwds = {}
+    bit = 1
+    for key, attr, optional, (_, decode) in fields:
+        try:
+            if optional:
+                present = bits & bit
+                bit <<= 1
+                if not present:
+                    if isinstance(attr, NoneableAttr):
+                        kwds[key] = None
+                    else:
+                        kwds[key] = attr.key_not_present(key, "object")
+                    continue
+            kwds[key], pos = decode(buf, pos)
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(key)
+            raise
+    kwds["__raw__"] = True
+    return attrobj_cls(**kwds), pos
+
+
+def dumps_binary(obj):
+    u'obj를 binary format의 byte string으로 만든다.'
+    out = []
+    encode_object(type(obj), obj, out)
+    return "".join(out)
+
+
+def loads_binary(attrobj_cls, data):
+    u'dumps_binary()의 결과로부터 attrobj_cls(또는 그 subclass)의 객체를 만든다.'
+    try:
+        obj, pos = decode_object(attrobj_cls, data, 0)
+    except (IndexError, struct.error):
+        raise LoadFailedError("Truncated binary data")
+    if pos != len(data):
+        raise LoadFailedError("%d trailing bytes after the object"
+                              % (len(data) - pos))
+    return obj
@@ -0,0 +1,385 @@
+# coding: utf-8
+u'''
+flat한 AttrObject들과 NumPy column 사이의 변환.
+NumPy is an optional dependency; the functions here raise ImportError when
+it is not installed.
+'''
+
+import keyword
+
+from operator import attrgetter
+from functools import partial
+from itertools import izip
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from serialize import (Attr, IntegerAttr, FloatAttr, SimpleTypeAttr, BytesAttr,
+                       UnicodeAttr, ChoiceAttr, StringChoiceAttr, OptionalAttr,
+                       NoneableAttr, LoadFailedError, DumpFailedError,
+                       MappingFailedError, compile_field_dumpers,
+                       _identifier_re)
+
+
+_dtype_rules = {}
+
+def dtype_rule(*attr_classes):
+    u'''
+    (attr, values) -> dtype 함수를 등록한다. values는 그 column의 값 list다.
+    A rule returns None when the column has to fall back to dtype object.
+    '''
+    def decorator(fn):
+        for attr_cls in attr_classes:
+            _dtype_rules[attr_cls] = fn
+        return fn
+    return decorator
+
+
+def column_dtype(attr, values):
+    rule = _dtype_rules.get(type(attr))
+    dtype = None
+    if rule is not None:
+        dtype = rule(attr, values)
+    return numpy.dtype(dtype or object)
+
+
+_check_rules = {}
+
+def check_rule(*attr_classes):
+    u'''
+    (attr, column) -> column 함수를 등록한다. column 전체를 한 번에 검사하고,
+    필요하면 변환한 array를 리턴한다. A rule returns None to fall back to
+    attr.loads() per value; a failure in a row is raised scoped like "[3]".
+    '''
+    def decorator(fn):
+        for attr_cls in attr_classes:
+            _check_rules[attr_cls] = fn
+        return fn
+    return decorator
+
+
+def check_column(attr, column):
+    rule = _check_rules.get(type(attr))
+    if rule is not None:
+        checked = rule(attr, column)
+        if checked is not None:
+            return checked
+    values = column.tolist()
+    for idx, value in enumerate(values):
+        try:
+            values[idx] = attr.loads(value, "object")
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(u"[%d]" % idx)
+            raise
+    return values
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError("NumPy is required for columnar conversion")
+
+
+def _max_len(values):
+    return max([1] + [len(v) for v in values])
+
+
+def _string_dtype(kind, values):
+    # fixed-width string dtypes drop trailing NULs, so such columns stay
+    # dtype object
+    if any(v.endswith("\x00") for v in values):
+        return None
+    return "%s%d" % (kind, _max_len(values))
+
+
+def _kinds_of_types(types):
+    kinds = ""
+    for t in types:
+        if t is bool:
+            kinds += "b"
+        elif issubclass(t, (int, long)):
+            kinds += "iu"
+        elif issubclass(t, float):
+            kinds += "f"
+        elif issubclass(t, bytes):
+            kinds += "S"
+        elif issubclass(t, unicode):
+            kinds += "U"
+        else:
+            return None
+    return kinds
+
+
+def _check_kinds(column, kinds, types):
+    if column.dtype.kind not in kinds:
+        raise LoadFailedError("Type Mismatch: column of dtype %s doesn't match "
+                              "with types (%s)" % (column.dtype, ", ".join(
+                                  t.__name__ for t in types)))
+    return column
+
+
+def _dtype_of_types(types, values):
+    if types == (bool, ):
+        return "?"
+    if all(issubclass(t, (int, long)) and t is not bool for t in types):
+        return "i8"
+    if all(issubclass(t, (int, long, float)) and t is not bool for t in types):
+        return "f8"
+    if all(issubclass(t, bytes) for t in types):
+        return _string_dtype("S", values)
+    if all(issubclass(t, unicode) for t in types):
+        return _string_dtype("U", values)
+    return None
+
+
+@dtype_rule(IntegerAttr)
+def integer_dtype_rule(attr, values):
+    return "i8"
+
+
+@dtype_rule(FloatAttr)
+def float_dtype_rule(attr, values):
+    return "f8"
+
+
+@dtype_rule(SimpleTypeAttr)
+def simple_type_dtype_rule(attr, values):
+    return _dtype_of_types(attr.types, values)
+
+
+@dtype_rule(BytesAttr)
+def bytes_dtype_rule(attr, values):
+    return _string_dtype("S", values)
+
+
+@dtype_rule(UnicodeAttr)
+def unicode_dtype_rule(attr, values):
+    return _string_dtype("U", values)
+
+
+@dtype_rule(ChoiceAttr, StringChoiceAttr)
+def choice_dtype_rule(attr, values):
+    return _dtype_of_types(tuple(set(map(type, attr.choices))), attr.choices)
+
+
+@dtype_rule(OptionalAttr, NoneableAttr)
+def optional_dtype_rule(attr, values):
+    if any(value is None for value in values):
+        if isinstance(attr.wrapped_attr, FloatAttr):
+            return "f8" # None becomes NaN
+        return None
+    return column_dtype(attr.wrapped_attr, values)
+
+
+_column_checkers = {}
+
+def column_checker(attrobj_cls):
+    u'''
+    key -> column의 값들을 compiled dumper와 같이 검사하는 함수의 dict.
+    Only attributes with a dtype rule are checked; the values of other
+    columns are stored as they are.
+    '''
+    try:
+        return _column_checkers[attrobj_cls]
+    except KeyError:
+        pass
+    signature = attrobj_cls.type_signature()
+    checkers = {}
+    for key, dumper in compile_field_dumpers(attrobj_cls, "object").items():
+        if type(signature[key]) in _dtype_rules:
+            checkers[key] = partial(map, dumper)
+    _column_checkers[attrobj_cls] = checkers
+    return checkers
+
+
+_column_getters = {}
+
+def column_getter(attrobj_cls, keys):
+    u'''
+    objs를 받아 keys 순서대로 column별 값 list들을 리턴하는 함수.
+    The generated list comprehensions read attributes much faster than
+    getattr()/attrgetter with non-interned names.
+    '''
+    try:
+        return _column_getters[attrobj_cls]
+    except KeyError:
+        pass
+    if all(_identifier_re.match(key) and not keyword.iskeyword(key)
+           for key in keys):
+        source = "def get_columns(objs):\n    return [%s]\n" % ", ".join(
+            "[o.%s for o in objs]" % key for key in keys)
+        namespace = {}
+        exec compile(source, "<columns of %s>" % attrobj_cls.__name__,
+                     "exec") in namespace
+        getter = namespace["get_columns"]
+    else:
+        getters = map(attrgetter, keys)
+        getter = lambda objs: [map(get, objs) for get in getters]
+    _column_getters[attrobj_cls] = getter
+    return getter
+
+
+def _to_array(values, dtype):
+    if dtype.kind in "biuf":
+        return numpy.fromiter(values, dtype=dtype, count=len(values))
+    if dtype.kind != "O":
+        return numpy.array(values, dtype=dtype)
+    # numpy.array() would turn equal-length lists into a 2-D array
+    column = numpy.empty(len(values), dtype=object)
+    for idx, value in enumerate(values):
+        column[idx] = value
+    return column
+
+
+@check_rule(IntegerAttr)
+def integer_check_rule(attr, column):
+    if column.dtype.kind != "O":
+        return _check_kinds(column, "iu", (int, long))
+
+
+@check_rule(FloatAttr)
+def float_check_rule(attr, column):
+    if column.dtype.kind != "O":
+        return _check_kinds(column, "iuf", (int, long, float)).astype(float)
+
+
+@check_rule(SimpleTypeAttr)
+def simple_type_check_rule(attr, column):
+    kinds = _kinds_of_types(attr.types)
+    if kinds is not None and column.dtype.kind != "O":
+        return _check_kinds(column, kinds, attr.types)
+
+
+@check_rule(BytesAttr)
+def bytes_check_rule(attr, column):
+    if column.dtype.kind == "S":
+        return column
+
+
+@check_rule(UnicodeAttr)
+def unicode_check_rule(attr, column):
+    if column.dtype.kind == "U":
+        return column
+
+
+@check_rule(ChoiceAttr, StringChoiceAttr)
+def choice_check_rule(attr, column):
+    if column.dtype.kind == "O":
+        return None
+    bad = numpy.flatnonzero(~numpy.in1d(column, list(attr.choices)))
+    if len(bad):
+        exc = LoadFailedError("%s doesn't matched with choices: %s" % (
+            repr(column[bad[0]].item()), ", ".join(map(repr, attr.choices))))
+        exc.wrap_with_scope(u"[%d]" % bad[0])
+        raise exc
+    return column
+
+
+@check_rule(OptionalAttr, NoneableAttr)
+def optional_check_rule(attr, column):
+    wrapped_attr = Attr.coerce(attr.wrapped_attr)
+    if column.dtype.kind == "f" and isinstance(wrapped_attr, FloatAttr):
+        # NaN is how to_columns() stores None
+        result = column.astype(object)
+        result[numpy.isnan(column)] = None
+        return result
+    if column.dtype.kind != "O":
+        return check_column(wrapped_attr, column)
+    values = column.tolist()
+    for idx, value in enumerate(values):
+        if value is None:
+            continue
+        try:
+            values[idx] = wrapped_attr.loads(value, "object")
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(u"[%d]" % idx)
+            raise
+    return values
+
+
+def to_columns(attrobj_cls, objs, structured=False):
+    u'''
+    objs의 attribute들을 column별 NumPy array로 옮긴다.
+    Returns a dict of 1-D arrays keyed by attribute name, or a single
+    structured array when structured is set. dtypes are derived from
+    type_signature(); attributes without a rule get dtype object. Values
+    are type-checked like dumps_dict() does.
+    '''
+    _require_numpy()
+    signature = attrobj_cls.type_signature()
+    keys = sorted(signature)
+    if not isinstance(objs, list):
+        objs = list(objs)
+
+    checkers = column_checker(attrobj_cls)
+    columns = []
+    for key, values in zip(keys, column_getter(attrobj_cls, keys)(objs)):
+        if key in checkers:
+            checkers[key](values) # raises DumpFailedError scoped by key
+        dtype = column_dtype(signature[key], values)
+        try:
+            columns.append(_to_array(values, dtype))
+        except (TypeError, ValueError, OverflowError) as exc:
+            err = DumpFailedError("Cannot convert to %s: %s" % (dtype, exc))
+            err.wrap_with_scope(key)
+            raise err
+
+    if not structured:
+        return dict(zip(keys, columns))
+    result = numpy.empty(len(objs), dtype=[(str(key), column.dtype)
+                                           for key, column
+                                           in zip(keys, columns)])
+    for key, column in zip(keys, columns):
+        result[key] = column
+    return result
+
+
+def from_columns(attrobj_cls, columns, lazy=False):
+    u'''
+    to_columns()의 역. column 단위로 dtype과 choices를 한 번에 검사한 뒤
+    do_raw_construction으로 인스턴스들을 만든다.
+    columns is a dict of 1-D arrays or a structured array. Missing columns
+    are filled like missing keys of loads_dict(); errors are scoped like
+    "score[3]". With lazy set, instances are yielded one at a time after
+    all columns have been checked.
+    '''
+    _require_numpy()
+    signature = attrobj_cls.type_signature()
+    if isinstance(columns, numpy.ndarray):
+        names = columns.dtype.names or ()
+        columns = dict((name, columns[name]) for name in names)
+
+    lengths = set(len(columns[key]) for key in signature if key in columns)
+    if len(lengths) > 1:
+        raise LoadFailedError("Columns have different lengths: %s"
+                              % sorted(lengths))
+    length = lengths.pop() if lengths else 0
+
+    keys = sorted(signature)
+    checked = []
+    for key in keys:
+        attr = signature[key]
+        try:
+            if key in columns:
+                column = check_column(attr, numpy.asarray(columns[key]))
+                if isinstance(column, numpy.ndarray):
+                    column = column.tolist()
+            else:
+                column = [attr.key_not_present(key, "object")
+                          for _ in xrange(length)]
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(key)
+            raise
+        checked.append(column)
+
+    def iter_objs():
+        for values in izip(*checked):
+            kwds = dict(izip(keys, values))
+            kwds["__raw__"] = True
+            yield attrobj_cls(**kwds)
+    if not keys:
+        objs = (attrobj_cls(__raw__=True) for _ in xrange(length))
+    else:
+        objs = iter_objs()
+    return objs if lazy else list(objs)
@@ -0,0 +1,206 @@
+# coding: utf-8
+u'''
+load된 객체들의 문자열과 frozen sub-object를 공유하게 만드는 interning.
+
+An InternTable maps each value to the first equal value it has seen, so
+the same country code or tag name read a million times is kept once.
+Values are keyed by (type, value): u"a" and "a" are never merged. The
+table is bounded; once max_size entries are stored, new values are
+returned as they are.
+
+Interned fields:
+
+    UnicodeAttr, BytesAttr   interned strings
+    ChoiceAttr               the matching object of choices
+    FrozenAttrObject         a structurally equal instance seen before
+    ListAttr, DictAttr,      walked item by item
+    AttrObject
+'''
+
+from itertools import cycle, izip
+
+from serialize import (Attr, AttrObject, FrozenAttrObject, SimpleTypeAttr,
+                       BytesAttr, UnicodeAttr, ChoiceAttr, StringChoiceAttr,
+                       ListAttr, DictAttr, SignatureDictAttr, OptionalAttr,
+                       NoneableAttr, AttrObjectAdapter)
+
+
+class InternTable(object):
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._table = {}
+
+    def __len__(self):
+        return len(self._table)
+
+    def clear(self):
+        self._table.clear()
+
+    def intern(self, value):
+        key = (type(value), value)
+        try:
+            return self._table[key]
+        except KeyError:
+            pass
+        except TypeError: # unhashable
+            return value
+        if len(self._table) < self.max_size:
+            self._table[key] = value
+        return value
+
+
+_intern_rules = {}
+
+def intern_rule(*attr_classes):
+    u'''
+    attr -> intern(value, table) 함수를 등록한다. intern returns the value
+    to store in place of value. A rule returns None when values of the attr
+    have nothing to intern.
+    '''
+    def decorator(fn):
+        for attr_cls in attr_classes:
+            _intern_rules[attr_cls] = fn
+        return fn
+    return decorator
+
+
+def interner_of(attr):
+    attr = Attr.coerce(attr)
+    rule = _intern_rules.get(type(attr))
+    if rule is None:
+        return None
+    return rule(attr)
+
+
+def _intern_strings(value, table):
+    if isinstance(value, basestring):
+        return table.intern(value)
+    return value
+
+
+@intern_rule(BytesAttr, UnicodeAttr)
+def string_intern_rule(attr):
+    return _intern_strings
+
+
+@intern_rule(SimpleTypeAttr)
+def simple_type_intern_rule(attr):
+    if all(issubclass(t, basestring) for t in attr.types):
+        return _intern_strings
+
+
+@intern_rule(ChoiceAttr, StringChoiceAttr)
+def choice_intern_rule(attr):
+    canonical = {}
+    for choice in attr.choices:
+        try:
+            canonical.setdefault((type(choice), choice), choice)
+        except TypeError:
+            pass
+    def intern(value, table):
+        try:
+            return canonical.get((type(value), value), value)
+        except TypeError:
+            return value
+    return intern
+
+
+@intern_rule(OptionalAttr, NoneableAttr)
+def optional_intern_rule(attr):
+    intern_wrapped = interner_of(attr.wrapped_attr)
+    if intern_wrapped is None:
+        return None
+    def intern(value, table):
+        if value is None:
+            return value
+        return intern_wrapped(value, table)
+    return intern
+
+
+@intern_rule(ListAttr)
+def list_intern_rule(attr):
+    item_interners = [interner_of(item_attr) for item_attr in attr.attrs]
+    if not any(item_interners):
+        return None
+    def intern(value, table):
+        if not isinstance(value, list):
+            return value
+        for idx, (intern_item, item) in enumerate(izip(cycle(item_interners),
+                                                       value)):
+            if intern_item is not None:
+                value[idx] = intern_item(item, table)
+        return value
+    return intern
+
+
+def _dict_interner(signature):
+    fields = [(key, interner_of(attr)) for key, attr in signature.items()]
+    fields = [(key, intern) for key, intern in fields if intern is not None]
+    if not fields:
+        return None
+    def intern(value, table):
+        if not isinstance(value, dict):
+            return value
+        for key, intern_field in fields:
+            if key in value:
+                value[key] = intern_field(value[key], table)
+        return value
+    return intern
+
+
+@intern_rule(DictAttr)
+def dict_intern_rule(attr):
+    return _dict_interner(attr._signature)
+
+
+@intern_rule(SignatureDictAttr)
+def signature_dict_intern_rule(attr):
+    return _dict_interner(attr.signature)
+
+
+@intern_rule(AttrObjectAdapter)
+def attrobj_intern_rule(attr):
+    def intern(value, table):
+        if not isinstance(value, AttrObject):
+            return value
+        value = intern_object(value, table)
+        if isinstance(value, FrozenAttrObject):
+            return table.intern(value)
+        return value
+    return intern
+
+
+_plans = {}
+
+def _plan(attrobj_cls):
+    u'(key, intern 함수) 의 list. intern할 것이 없는 attribute는 빠진다.'
+    try:
+        return _plans[attrobj_cls]
+    except KeyError:
+        pass
+    plan = []
+    for key, attr in attrobj_cls.type_signature().items():
+        intern = interner_of(attr)
+        if intern is not None:
+            plan.append((key, intern))
+    _plans[attrobj_cls] = plan
+    return plan
+
+
+def intern_object(obj, table):
+    u'''
+    obj의 attribute 값들을 table을 통해 intern한다. obj itself is updated in
+    place (frozen ones included) and returned; its FrozenAttrObject
+    sub-objects are replaced by equal ones already in table.
+    '''
+    for key, intern in _plan(type(obj)):
+        try:
+            value = getattr(obj, key)
+        except AttributeError:
+            continue
+        interned = intern(value, table)
+        if interned is not value:
+            # bypasses FrozenAttrObject and TrackedAttrObject: values only
+            # change identity, not equality
+            object.__setattr__(obj, key, interned)
+    return obj
@@ -23,15 +23,35 @@ THE SOFTWARE.
 
 import re
 import json
+import hashlib
 import inspect
+import keyword
+import threading
+import multiprocessing
 
 from datetime import datetime, time
-from itertools import chain as chain_iters, cycle, izip
+from itertools import chain as chain_iters, cycle, izip, islice
 from operator import isCallable
 from collections import Iterable, deque
 from functools import partial
+from multiprocessing.pool import ThreadPool
 
-from parse import AttributeSignature
+from parse import AttributeSignature, parse_pattern, ordinal
+from stream import (open_stream, iter_lines, iter_json_array, LineBuffer,
+                    build_jsonl_index, IndexedJSONLines)
+
+
+_identifier_re = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# "json_compact" is "json" with AttrObjects encoded as arrays
+JSON_ENV_TYPES = ("json", "json_compact")
+
+
+def compact_keys(signature):
+    u'json_compact에서 field들의 순서. positional argument들 다음에 나머지를 정렬한다.'
+    positional = [key for key in signature._args if key is not None]
+    rest = set(signature) - set(positional)
+    return positional + sorted(rest)
 
 
 def _all_subclasses(cls):
@@ -62,19 +82,49 @@ class SkipAll(Exception):
         self.retval = retval
 
 
+class _Sentinel(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+# wrap_loads/wrap_dumps가 이것을 리턴하면 값을 그대로 통과시킨다. (raise PassThrough)
+PASS_THROUGH = _Sentinel("PASS_THROUGH")
+
+class Skip(object):
+    u'''
+    pre_loads/wrap_loads/wrap_dumps가 이것을 리턴하면 나머지 과정을 건너뛰고
+    retval을 결과로 한다. (raise SkipAll(retval))
+    '''
+    __slots__ = ("retval", )
+
+    def __init__(self, retval):
+        self.retval = retval
+
+SKIP_NONE = Skip(None)
+
+
 class MappingFailedError(ValueError):
     def __init__(self, *args, **kwds):
         super(MappingFailedError, self).__init__(*args, **kwds)
         self.scopes = deque()
+        self.lineno = None # set by the line-oriented streaming APIs
+        # set when scopes already hold the full path, e.g. by loads_lazy()
+        self.scope_closed = False
 
     def __str__(self):
         args = self.args
         if not isinstance(args, (list, tuple)):
             args = (args, )
-        return "".join(args) + " [%s]"%self.scope_name
+        msg = "".join(args) + " [%s]"%self.scope_name
+        if self.lineno is not None:
+            msg = "line %d: %s" % (self.lineno, msg)
+        return msg
     
     def wrap_with_scope(self, scope):
-        self.scopes.appendleft(scope)
+        if not self.scope_closed:
+            self.scopes.appendleft(scope)
 
     @property
     def scope_name(self):
@@ -98,12 +148,484 @@ class DumpFailedError(MappingFailedError):
     pass
 
 
+_missing_argument = object()
+
+# bumped whenever an AbstractAttrObject subclass is registered; cached
+# schema fingerprints from an older generation are stale
+_registry_generation = [0]
+
+
+class SchemaCompiler(object):
+    u'''
+    type_signature()로부터 특화된 함수의 소스를 생성하고 exec한다.
+    Attrs without a registered rule are called through their own
+    loads/dumps, so the generated function behaves exactly like the generic
+    Attr tree.
+    '''
+    _load_rules = {}
+    _missing_rules = {}
+    _dump_rules = {}
+
+    @classmethod
+    def _set_rule(cls, rule_dict, attr_types):
+        def wrapper(rule):
+            assert isCallable(rule)
+            for attr_type in attr_types:
+                rule_dict[attr_type] = rule
+            return rule
+        return wrapper
+
+    @classmethod
+    def load_rule(cls, *attr_types):
+        return cls._set_rule(cls._load_rules, attr_types)
+
+    @classmethod
+    def missing_rule(cls, *attr_types):
+        return cls._set_rule(cls._missing_rules, attr_types)
+
+    @classmethod
+    def dump_rule(cls, *attr_types):
+        return cls._set_rule(cls._dump_rules, attr_types)
+
+    def __init__(self, attrobj_cls, env_type):
+        self.attrobj_cls = attrobj_cls
+        self.env_type = env_type
+        self.lines = []
+        self.namespace = {
+            "AttrObject": AttrObject,
+            "Iterable": Iterable,
+            "MappingFailedError": MappingFailedError,
+            "LoadFailedError": LoadFailedError,
+            "DumpFailedError": DumpFailedError,
+        }
+        self._serial = 0
+
+    def fresh(self, prefix):
+        self._serial += 1
+        return "%s%d" % (prefix, self._serial)
+
+    def const(self, value, prefix="c"):
+        name = self.fresh(prefix)
+        self.namespace[name] = value
+        return name
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def build(self, funcname):
+        source = "\n".join(self.lines) + "\n"
+        code = compile(source,
+                       "<%s of %s>" % (funcname, self.attrobj_cls.__name__),
+                       "exec")
+        exec code in self.namespace
+        func = self.namespace[funcname]
+        func.source = source
+        return func
+
+    def emit_type_check(self, src, types, depth):
+        types_const = self.const(tuple(types), "types")
+        suffix = self.const(" doesn't match with types (%s)"
+                            % ", ".join(map(repr, types)), "msg")
+        self.emit(depth, "if not isinstance(%s, %s):" % (src, types_const))
+        self.emit(depth + 1,
+                  "raise LoadFailedError('Type Mismatch: ' + repr(%s) + %s)"
+                  % (src, suffix))
+
+    def emit_dump_type_check(self, src, types, depth):
+        types_const = self.const(tuple(types), "types")
+        msg = self.const("Type Mismatch: Nothing matched wit htypes (%s)"
+                         % ", ".join(map(repr, types)), "msg")
+        self.emit(depth, "if not isinstance(%s, %s):" % (src, types_const))
+        self.emit(depth + 1, "raise DumpFailedError(%s)" % msg)
+
+    def compile_loader(self, construct=False):
+        u'''
+        dict를 읽어 attribute dict를 리턴하는 함수를 만든다. With construct
+        set, the function returns the instance itself instead: see
+        compile_builder().
+        '''
+        if self.env_type == "json_compact":
+            return self.compile_compact_loader(construct)
+        signature = self.attrobj_cls.type_signature()
+        self.emit(0, "def load(d):")
+        self.emit_type_check("d", (dict, ), 1)
+        self.emit_result_init(construct)
+        if signature:
+            self.emit(1, "k = None")
+            self.emit(1, "try:")
+            for key, attr in signature.items():
+                self.emit(2, "k = %r" % key)
+                self.emit(2, "try:")
+                self.emit(3, "v = d[k]")
+                self.emit(2, "except KeyError:")
+                self.emit_store(3, key, self.load_missing(attr), construct)
+                self.emit(2, "else:")
+                self.emit_store(3, key, self.load_value(attr, "v", 3),
+                                construct)
+            self.emit(1, "except MappingFailedError as exc:")
+            self.emit(2, "exc.wrap_with_scope(k)")
+            self.emit(2, "raise")
+        self.emit_result_return(construct)
+        return self.build("load")
+
+    def compile_builder(self):
+        u'''
+        dict를 읽어 attrobj_cls의 instance를 바로 만드는 함수를 만든다. It does
+        what the default raw construction does -- __new__, setattr for every
+        attribute, then _postinit_chain -- without the intermediate dict
+        and keyword arguments.
+        '''
+        return self.compile_loader(construct=True)
+
+    def emit_result_init(self, construct):
+        if construct:
+            cls_const = self.const(self.attrobj_cls, "cls")
+            self.emit(1, "r = %s.__new__(%s)" % (cls_const, cls_const))
+        else:
+            self.emit(1, "r = {}")
+
+    def emit_store(self, depth, key, expr, construct):
+        if not construct:
+            self.emit(depth, "r[k] = %s" % expr)
+        elif _identifier_re.match(key) and not keyword.iskeyword(key):
+            self.emit(depth, "r.%s = %s" % (key, expr))
+        else:
+            self.emit(depth, "setattr(r, k, %s)" % expr)
+
+    def emit_result_return(self, construct):
+        postinits = self.attrobj_cls._postinit_chain
+        if construct and postinits:
+            self.emit(1, "for p in %s:" % self.const(postinits, "postinits"))
+            self.emit(2, "p(r)")
+        self.emit(1, "return r")
+
+    def compile_compact_loader(self, construct=False):
+        u'field들이 compact_keys() 순서로 담긴 array를 읽는다. null은 OptionalAttr의 부재다.'
+        signature = self.attrobj_cls.type_signature()
+        offset = 1 if self.attrobj_cls._compact_type_tagged() else 0
+        size = offset + len(signature)
+        self.emit(0, "def load(d):")
+        self.emit_type_check("d", (list, tuple), 1)
+        self.emit(1, "if len(d) != %d:" % size)
+        self.emit(2, "raise LoadFailedError(%s %% len(d))" % self.const(
+            "Expected an array of %d items, got %%d" % size, "msg"))
+        self.emit_result_init(construct)
+        if signature:
+            self.emit(1, "k = None")
+            self.emit(1, "try:")
+            for idx, key in enumerate(compact_keys(signature), offset):
+                attr = signature[key]
+                self.emit(2, "k = %r" % key)
+                self.emit(2, "v = d[%d]" % idx)
+                if isinstance(attr, OptionalAttr):
+                    self.emit(2, "if v is None:")
+                    self.emit_store(3, key, self.load_missing(attr), construct)
+                    self.emit(2, "else:")
+                    self.emit_store(3, key, self.load_value(attr, "v", 3),
+                                    construct)
+                else:
+                    self.emit_store(2, key, self.load_value(attr, "v", 2),
+                                    construct)
+            self.emit(1, "except MappingFailedError as exc:")
+            self.emit(2, "exc.wrap_with_scope(k)")
+            self.emit(2, "raise")
+        self.emit_result_return(construct)
+        return self.build("load")
+
+    def load_missing(self, attr):
+        u'key가 없을 때의 값을 나타내는 식을 리턴한다. k에 key가 들어있다.'
+        rule = self._missing_rules.get(type(attr))
+        if rule is not None:
+            return rule(self, attr)
+        return "%s.key_not_present(k, %r)" % (self.const(attr, "attr"),
+                                               self.env_type)
+
+    def load_value(self, attr, src, depth):
+        u'src를 attr로 load하는 코드를 emit하고, 결과를 담은 식을 리턴한다.'
+        rule = self._load_rules.get(type(attr))
+        if rule is not None:
+            result = rule(self, attr, src, depth)
+            if result is not None:
+                return result
+
+        result = self.fresh("x")
+        self.emit(depth, "%s = %s.loads(%s, %r)" % (
+            result, self.const(attr, "attr"), src, self.env_type))
+        return result
+
+    def compile_dumper(self):
+        if self.env_type == "json_compact":
+            return self.compile_compact_dumper()
+        attrobj_cls = self.attrobj_cls
+        self.emit(0, "def dump(o):")
+        self.emit(1, "r = {}")
+        signature = attrobj_cls.type_signature()
+        if signature:
+            self.emit(1, "k = None")
+            self.emit(1, "try:")
+            for key, attr in signature.items():
+                self.emit(2, "k = %r" % key)
+                if _identifier_re.match(key):
+                    self.emit(2, "v = o.%s" % key)
+                else:
+                    self.emit(2, "v = getattr(o, k)")
+                self.emit(2, "r[k] = %s" % self.dump_value(attr, "v", 2))
+            self.emit(1, "except MappingFailedError as exc:")
+            self.emit(2, "exc.wrap_with_scope(k)")
+            self.emit(2, "raise")
+
+        inject_extra = attrobj_cls.inject_extra.im_func
+        if inject_extra is AbstractAttrObject.inject_extra.im_func:
+            self.emit(1, "r[%r] = %r" % (attrobj_cls.type_key,
+                                         attrobj_cls._get_type_value()))
+        elif inject_extra is not AttrObject.inject_extra.im_func:
+            self.emit(1, "o.inject_extra(r)")
+        self.emit(1, "return r")
+        return self.build("dump")
+
+    def compile_compact_dumper(self):
+        attrobj_cls = self.attrobj_cls
+        self.emit(0, "def dump(o):")
+        self.emit(1, "r = []")
+        if attrobj_cls._compact_type_tagged():
+            self.emit(1, "r.append(%r)" % attrobj_cls._get_type_value())
+        signature = attrobj_cls.type_signature()
+        if signature:
+            self.emit(1, "k = None")
+            self.emit(1, "try:")
+            for key in compact_keys(signature):
+                self.emit(2, "k = %r" % key)
+                if _identifier_re.match(key):
+                    self.emit(2, "v = o.%s" % key)
+                else:
+                    self.emit(2, "v = getattr(o, k)")
+                self.emit(2, "r.append(%s)" % self.dump_value(signature[key],
+                                                              "v", 2))
+            self.emit(1, "except MappingFailedError as exc:")
+            self.emit(2, "exc.wrap_with_scope(k)")
+            self.emit(2, "raise")
+        self.emit(1, "return r")
+        return self.build("dump")
+
+    def compile_field_dumpers(self):
+        u'key -> 그 attribute의 값 하나를 dump하는 함수의 dict를 만든다.'
+        signature = self.attrobj_cls.type_signature()
+        funcnames = {}
+        for idx, (key, attr) in enumerate(signature.items()):
+            funcnames[key] = "dump_%d" % idx
+            self.emit(0, "def %s(v):" % funcnames[key])
+            self.emit(1, "try:")
+            self.emit(2, "return %s" % self.dump_value(attr, "v", 2))
+            self.emit(1, "except MappingFailedError as exc:")
+            self.emit(2, "exc.wrap_with_scope(%r)" % key)
+            self.emit(2, "raise")
+        if not funcnames:
+            return {}
+        self.build(funcnames.values()[0])
+        return dict((key, self.namespace[funcname])
+                    for key, funcname in funcnames.items())
+
+    def dump_value(self, attr, src, depth):
+        u'src를 attr로 dump하는 코드를 emit하고, 결과를 담은 식을 리턴한다.'
+        rule = self._dump_rules.get(type(attr))
+        if rule is not None:
+            result = rule(self, attr, src, depth)
+            if result is not None:
+                return result
+
+        result = self.fresh("x")
+        self.emit(depth, "%s = %s.dumps(%s, %r)" % (
+            result, self.const(attr, "attr"), src, self.env_type))
+        return result
+
+
+    # names the generated __init__ uses besides its parameters
+    _constructor_locals = frozenset([
+        "self", "_kwds", "_applied", "_extra", "_key", "_value", "_loaded",
+        "_postinit", "_args", "TypeError", "map", "repr", "setattr", "type",
+    ])
+
+    def compile_constructor(self):
+        u'''
+        AttributeSignature.apply_arguments()를 대신하는, 실제 파이썬 signature를
+        가진 __init__을 만든다. Returns None when the attribute names cannot
+        be used as parameter names.
+        '''
+        attrobj_cls = self.attrobj_cls
+        signature = AttributeSignature(attrobj_cls.unified_attributes())
+        positional = list(signature._args)
+        vararg = signature._vararg
+        varkwd = signature._varkwd
+        missing = self.const(_missing_argument, "missing")
+        postinits = self.const(attrobj_cls._postinit_chain, "postinits")
+
+        params = ["self"]
+        params.extend("%s=%s" % (name, missing) for name in positional)
+        # extra positional arguments are reported like apply_arguments() does
+        params.append("*%s" % (vararg or "_args"))
+        params.append("**_kwds")
+        self.emit(0, "def __init__(%s):" % ", ".join(params))
+
+        # a subclass with its own __init__ may reach here through super()
+        self.emit(1, "if type(self) is not %s:" % self.const(attrobj_cls, "cls"))
+        self.emit(2, "return %s(self, %s, (%s), %s, _kwds)" % (
+            self.const(_init_subclass_instance, "init_subclass"),
+            self.const(tuple(positional), "names"),
+            "".join("%s, " % name for name in positional),
+            vararg or "_args"))
+
+        self.emit(1, "if _kwds and ('__raw__' in _kwds or '__bootstrap__' in _kwds):")
+        for name in positional:
+            self.emit(2, "if %s is not %s:" % (name, missing))
+            self.emit(3, "_kwds[%r] = %s" % (name, name))
+        self.emit(2, "self.do_raw_construction((), _kwds)")
+        self.emit(1, "else:")
+        if not vararg:
+            self.emit(2, "if _args:")
+            self.emit(3, "raise TypeError(%r)" % (
+                "Unexpected %s positional argument"
+                % ordinal(len(positional) + 1)))
+        for idx, name in enumerate(positional):
+            self.emit(2, "if %s is %s:" % (name, missing))
+            self.emit(3, "raise TypeError(%r)" % (
+                "The %s positional argument '%s' is not applied"
+                % (ordinal(idx + 1), name)))
+        self.emit(2, "_applied = {%s}" % ", ".join(
+            "%r: %s" % (name, name) for name in positional))
+        if vararg:
+            self.emit(2, "_applied[%r] = %s" % (vararg, vararg))
+        if varkwd:
+            self.emit(2, "_extra = {}")
+        self.emit(2, "if _kwds:")
+        if not varkwd:
+            self.emit(3, "_extra = {}")
+        self.emit(3, "for _key, _value in _kwds.iteritems():")
+        self.emit(4, "if _key in %s:" % self.const(frozenset(signature._kwds),
+                                                   "keywords"))
+        self.emit(5, "_applied[_key] = _value")
+        self.emit(4, "else:")
+        self.emit(5, "_extra[_key] = _value")
+        if varkwd:
+            self.emit(2, "_applied[%r] = _extra" % varkwd)
+        else:
+            self.emit(3, "if _extra:")
+            self.emit(4, "raise TypeError('Unexpected keyword arguments: %s'"
+                         " % ', '.join(map(repr, _extra)))")
+        self.emit(2, "_loaded = self._get_compiled_loader('object')(_applied)")
+        for attrname in signature:
+            if _identifier_re.match(attrname) and not keyword.iskeyword(attrname):
+                self.emit(2, "self.%s = _loaded[%r]" % (attrname, attrname))
+            else:
+                self.emit(2, "setattr(self, %r, _loaded[%r])" % (attrname, attrname))
+        if attrobj_cls._postinit_chain:
+            self.emit(1, "for _postinit in %s:" % postinits)
+            self.emit(2, "_postinit(self)")
+
+        param_names = set(positional + filter(None, [vararg, varkwd]))
+        reserved = set(self.namespace) | self._constructor_locals
+        for name in param_names:
+            if (name in reserved or keyword.iskeyword(name)
+                    or not _identifier_re.match(name)):
+                return None
+
+        init = self.build("__init__")
+        init.is_compiled_constructor = True
+        return init
+
+
+def _init_subclass_instance(self, names, values, rest, kwds):
+    u'''
+    compile된 __init__의 인자들을 되돌려 AttrObject.__init__으로 넘긴다.
+    Used for instances of subclasses whose own __init__ calls the inherited
+    compiled one, so that their signature and __postinit__s apply.
+    '''
+    raw = '__raw__' in kwds or '__bootstrap__' in kwds
+    args = []
+    for idx, (name, value) in enumerate(izip(names, values)):
+        if value is _missing_argument:
+            continue
+        if idx == len(args) and not raw:
+            args.append(value)
+        else:
+            kwds[name] = value
+    args.extend(rest)
+    AttrObject.__init__(self, *args, **kwds)
+
+
+def compile_loader(attrobj_cls, env_type):
+    u'attrobj_cls의 dict를 읽어 loaded dict를 리턴하는 함수를 만든다.'
+    return SchemaCompiler(attrobj_cls, env_type).compile_loader()
+
+
+def compile_builder(attrobj_cls, env_type):
+    u'''
+    attrobj_cls의 dict를 읽어 instance를 리턴하는 함수를 만든다. Classes that
+    customize construction go through cls(__raw__=True, **loaded).
+    '''
+    if attrobj_cls._may_build_directly():
+        return SchemaCompiler(attrobj_cls, env_type).compile_builder()
+    loader = attrobj_cls._get_compiled_loader(env_type)
+    def build(d):
+        loaded = loader(d)
+        loaded["__raw__"] = True
+        return attrobj_cls(**loaded)
+    return build
+
+
+def compile_dumper(attrobj_cls, env_type):
+    u'attrobj_cls의 인스턴스를 dumped dict로 만드는 함수를 만든다.'
+    return SchemaCompiler(attrobj_cls, env_type).compile_dumper()
+
+
+def compile_field_dumpers(attrobj_cls, env_type):
+    return SchemaCompiler(attrobj_cls, env_type).compile_field_dumpers()
+
+
+def compile_constructor(attrobj_cls):
+    u'attrobj_cls의 __init__을 만든다. 만들 수 없으면 None을 리턴한다.'
+    try:
+        return SchemaCompiler(attrobj_cls, "object").compile_constructor()
+    except (TypeError, ValueError):
+        # malformed attribute patterns are reported by type_signature()
+        return None
+
+
 class MetaAttrObject(type):
+    def __new__(mcs, name, bases, members):
+        slotted = members.get('__slotted__',
+                              any(getattr(base, '__slotted__', False)
+                                  for base in bases))
+        if slotted:
+            members = dict(members)
+            members['__slots__'] = mcs._derive_slots(bases, members)
+        return type.__new__(mcs, name, bases, members)
+
+    @staticmethod
+    def _derive_slots(bases, members):
+        inherited = set()
+        for base in bases:
+            for supcls in inspect.getmro(base):
+                inherited.update(supcls.__dict__.get('__slots__', ()))
+
+        slots = list(members.get('__slots__', ()))
+        for key in sorted(members.get('attributes', {})):
+            attrname = parse_pattern(key)[2]
+            if attrname not in inherited and attrname not in slots:
+                slots.append(attrname)
+        return tuple(slots)
+
     def __init__(cls, name, bases, members):
         type.__init__(cls, name, bases, members)
 
         cls._cached_attributes = None
         cls._cached_type_signature = None
+        cls._cached_attr_adapter = None
+        cls._cached_signature_dict_attr = None
+        cls._compiled_loaders = {}
+        cls._compiled_builders = {}
+        cls._compiled_dumpers = {}
+        cls._cached_slot_names = None
+        cls._cached_schema_fingerprint = None
 
         attrs = members.get('attributes', {})
         cls.raw_attributes = attrs
@@ -113,16 +635,51 @@ class MetaAttrObject(type):
         except AttributeError:
             pass
 
+        if not any(isinstance(base, MetaAttrObject) for base in bases):
+            cls._postinit_chain = () # AttrObject itself
+            return
+
+        cls._postinit_chain = tuple(cls.class_attr_chain("__postinit__"))
+        if getattr(cls, '__frozen__', False):
+            cls._postinit_chain += (_freeze, ) # after every __postinit__
+        if '__init__' not in members and cls._may_compile_constructor():
+            cls.__init__ = compile_constructor(cls) or AttrObject.__init__.im_func
+
+        cls._register_class()
+
+    def _may_compile_constructor(cls):
+        init = cls.__init__.im_func
+        if not (init is AttrObject.__init__.im_func
+                or getattr(init, "is_compiled_constructor", False)):
+            return False # user-defined __init__
+        return (cls.do_schematic_construction.im_func
+                is AttrObject.do_schematic_construction.im_func)
+
+    def _may_build_directly(cls):
+        u'compile된 builder가 raw construction을 대신해도 되는가'
+        init = cls.__init__.im_func
+        if not (init is AttrObject.__init__.im_func
+                or getattr(init, "is_compiled_constructor", False)):
+            return False # user-defined __init__
+        if (cls.do_raw_construction.im_func
+                is not AttrObject.do_raw_construction.im_func):
+            return False
+        # __new__ is called without the keyword arguments
+        return all(supcls is object or supcls.__module__ == __name__
+                   for supcls in cls.__mro__ if '__new__' in supcls.__dict__)
+
 
 class AttrObject(object):
     __metaclass__ = MetaAttrObject
+    __slots__ = ()
+
     def __init__(self, *args, **kwds):
         if '__bootstrap__' not in kwds and '__raw__' not in kwds:
             self.do_schematic_construction(args, kwds)
         else:
             self.do_raw_construction(args, kwds)
 
-        for postinit in self.class_attr_chain("__postinit__"):
+        for postinit in self._postinit_chain:
             postinit(self)
 
     @classmethod
@@ -148,7 +705,37 @@ class AttrObject(object):
 
     @classmethod
     def get_attr_adapter(cls):
-        return AttrObjectAdapter(attrobj_cls=cls, __bootstrap__=True)
+        if cls._cached_attr_adapter is None:
+            cls._cached_attr_adapter = AttrObjectAdapter(attrobj_cls=cls,
+                                                         __bootstrap__=True)
+        return cls._cached_attr_adapter
+
+    @classmethod
+    def _get_compiled_loader(cls, env_type):
+        try:
+            return cls._compiled_loaders[env_type]
+        except KeyError:
+            loader = compile_loader(cls, env_type)
+            cls._compiled_loaders[env_type] = loader
+            return loader
+
+    @classmethod
+    def _get_compiled_builder(cls, env_type):
+        try:
+            return cls._compiled_builders[env_type]
+        except KeyError:
+            builder = compile_builder(cls, env_type)
+            cls._compiled_builders[env_type] = builder
+            return builder
+
+    @classmethod
+    def _get_compiled_dumper(cls, env_type):
+        try:
+            return cls._compiled_dumpers[env_type]
+        except KeyError:
+            dumper = compile_dumper(cls, env_type)
+            cls._compiled_dumpers[env_type] = dumper
+            return dumper
 
     def do_schematic_construction(self, args, kwds):
         adapter = self.get_attr_adapter()
@@ -182,6 +769,42 @@ class AttrObject(object):
             ))
         return cls._cached_type_signature
 
+    @classmethod
+    def _slot_names(cls):
+        if cls._cached_slot_names is None:
+            names = []
+            for supcls in cls.__mro__:
+                slots = supcls.__dict__.get('__slots__', ())
+                if isinstance(slots, basestring):
+                    slots = (slots, )
+                names.extend(name for name in slots
+                             if name not in ('__dict__', '__weakref__'))
+            cls._cached_slot_names = tuple(names)
+        return cls._cached_slot_names
+
+    def __getstate__(self):
+        u'''
+        pickle은 __init__을 거치지 않고 속성 값만 그대로 옮긴다.
+        Pending fields of loads_lazy() objects are loaded first, since the
+        receiving process may not have the lazy __getattr__ installed.
+        '''
+        lazy_state = getattr(self, '__dict__', {}).get('_lazy_state')
+        if lazy_state is not None:
+            for key in list(lazy_state[0]):
+                getattr(self, key)
+        state = dict(getattr(self, '__dict__', ()))
+        state.pop('_lazy_state', None)
+        for key in self._slot_names():
+            try:
+                state[key] = getattr(self, key)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.iteritems():
+            setattr(self, key, value)
+
     def items(self):
         for key in AttributeSignature(self.unified_attributes()):
             yield key, getattr(self, key)
@@ -189,6 +812,16 @@ class AttrObject(object):
     def shallow_dict(self):
         return dict(self.items())
 
+    @classmethod
+    def _register_class(cls):
+        u'MetaAttrObject가 클래스를 만든 직후에 부른다.'
+        pass
+
+    @classmethod
+    def guess_class(cls, dict_):
+        u'extract_class()와 같지만 dict_를 건드리지 않는다.'
+        return cls
+
     @classmethod
     def extract_class(cls, loaded_dict):
         return cls
@@ -197,23 +830,325 @@ class AttrObject(object):
     def inject_extra(cls, dumped_dict):
         pass
 
+    @classmethod
+    def _compact_type_tagged(cls):
+        u'json_compact array의 첫 item이 type value인지.'
+        return False
+
+    @classmethod
+    def _compact_class(cls, array):
+        u'json_compact에서 extract_class()에 해당한다.'
+        return cls
+
+    @classmethod
+    def schema_fingerprint(cls):
+        u'''
+        json_compact의 field 순서와 attr들로부터 만든 짧은 hash.
+        It covers the registered subclasses of abstract classes reachable
+        from cls, and is recomputed after a new one is defined.
+        '''
+        cached = cls._cached_schema_fingerprint
+        if cached is None or cached[0] != _registry_generation[0]:
+            description = _describe_schema(cls, [])
+            cached = cls._cached_schema_fingerprint = (
+                _registry_generation[0],
+                hashlib.sha1(description).hexdigest()[:8])
+        return cached[1]
+
     @classmethod
     def build(cls, *args, **kwds):
         return cls(*args, **kwds)
 
     @classmethod
-    def loads_dict(cls, dict_, env_type="object"):
+    def loads_dict(cls, dict_, env_type="object", interner=None):
+        u'''
+        interner가 주어지면 load한 문자열, choice와 frozen sub-object들을
+        intern한다. interner is True for a table used by this call only, or
+        an interning.InternTable to share across calls.
+        '''
         adapter = cls.get_attr_adapter()
-        return adapter.loads(dict_, env_type)
+        obj = adapter.loads(dict_, env_type)
+        if interner is not None:
+            obj = _interning(interner)(obj)
+        return obj
+
+    @classmethod
+    def loads_json_dict(cls, json_dict, interner=None):
+        return cls.loads_dict(json_dict, env_type="json", interner=interner)
+
+    @classmethod
+    def loads_lazy(cls, dict_, env_type="object"):
+        u'''
+        loads_dict()와 같지만 AttrObject, ListAttr, DictAttr 값들은 raw data로
+        두었다가 처음 접근할 때 검사하고 load한다. Nested objects are lazy
+        in turn, and errors raised on access carry the full scope path.
+        Slotted classes have nowhere to keep raw data and load eagerly, and
+        so do classes that define their own __getattr__.
+        '''
+        return _load_lazy(cls, dict_, env_type, ())
+
+    @classmethod
+    def loads_many(cls, dicts, env_type="object", errors="raise",
+                   interner=None):
+        u'''
+        dict들을 차례로 load해 list로 리턴한다. 클래스별 준비는 한 번만 한다.
+        errors is "raise" (the first failure is raised, scoped like "[3].id"),
+        "skip" (bad rows are dropped) or a list that collects
+        (index, MappingFailedError) pairs for the dropped rows.
+        interner is as in loads_dict(); True shares one table over the batch.
+        '''
+        adapter_loads = cls.get_attr_adapter().loads
+        if cls.extract_class.im_func is AttrObject.extract_class.im_func:
+            builder = cls._get_compiled_builder(env_type)
+            def load(dict_):
+                if type(dict_) is dict:
+                    return builder(dict_)
+                return adapter_loads(dict_, env_type)
+        else:
+            load = partial(adapter_loads, env_type=env_type)
+        if interner is not None:
+            load = _compose(_interning(interner), load)
+        return _map_with_policy(load, dicts, errors)
+
+    @classmethod
+    def loads_many_parallel(cls, records, workers=None, chunksize=1000,
+                            env_type=None, raw_json=False, dump=None,
+                            errors="raise"):
+        u'''
+        loads_many()를 multiprocessing.Pool의 worker들에 나누어 돌린다.
+        records are dicts, or JSON strings (e.g. JSON lines) when raw_json is
+        set; env_type then defaults to "json". With dump set to an env type,
+        workers return dumps_dict(dump) of each object instead of the object.
+        Results keep the input order. cls must be importable by the workers,
+        i.e. defined at module level.
+        '''
+        if env_type is None:
+            env_type = "json" if raw_json else "object"
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        records = iter(records)
+        def iter_tasks():
+            start = 0
+            while True:
+                chunk = list(islice(records, chunksize))
+                if not chunk:
+                    return
+                chunk_errors = [] if isinstance(errors, list) else errors
+                yield (cls, start, chunk, env_type, raw_json, dump,
+                       chunk_errors)
+                start += len(chunk)
+
+        if workers <= 1:
+            chunk_results = map(_load_chunk, iter_tasks())
+        else:
+            pool = multiprocessing.Pool(workers)
+            try:
+                chunk_results = list(pool.imap(_load_chunk, iter_tasks()))
+            finally:
+                pool.terminate()
+                pool.join()
+
+        result = []
+        for loaded, chunk_errors in chunk_results:
+            result.extend(loaded)
+            if isinstance(errors, list):
+                errors.extend(chunk_errors)
+        return result
+
+    @classmethod
+    def to_columns(cls, objs, structured=False):
+        u'columns.to_columns()를 보라. NumPy가 필요하다.'
+        from columns import to_columns
+        return to_columns(cls, objs, structured)
+
+    @classmethod
+    def from_columns(cls, columns, lazy=False):
+        u'columns.from_columns()를 보라. NumPy가 필요하다.'
+        from columns import from_columns
+        return from_columns(cls, columns, lazy)
+
+    @classmethod
+    def validate_dict(cls, dict_, env_type="object"):
+        u'loads_dict()처럼 검사하되 객체를 만들지 않는다. 첫 에러를 raise한다.'
+        cls.get_attr_adapter().validate(dict_, env_type)
+
+    @classmethod
+    def validate_json_dict(cls, json_dict):
+        cls.validate_dict(json_dict, env_type="json")
+
+    @classmethod
+    def validate_json(cls, s):
+        cls.validate_json_dict(json.loads(s))
 
     @classmethod
-    def loads_json_dict(cls, json_dict):
-        return cls.loads_dict(json_dict, env_type="json")
+    def validation_errors(cls, dict_, env_type="object"):
+        u'모든 MappingFailedError의 list를 리턴한다. 각 에러의 scope_name이 위치를 가리킨다.'
+        errors = []
+        try:
+            cls.get_attr_adapter().validate(dict_, env_type, errors)
+        except MappingFailedError as exc:
+            errors.append(exc)
+        return errors
 
     @classmethod
-    def loads_json(cls, s):
+    def loads_json(cls, s, compact=False, interner=None):
         json_dict = json.loads(s)
-        return cls.loads_json_dict(json_dict)
+        if compact:
+            obj = cls._loads_compact_envelope(json_dict)
+            if interner is not None:
+                obj = _interning(interner)(obj)
+            return obj
+        return cls.loads_json_dict(json_dict, interner)
+
+    @classmethod
+    def _loads_compact_envelope(cls, envelope):
+        if not (isinstance(envelope, list) and len(envelope) == 2):
+            raise LoadFailedError("Expected [fingerprint, data], got %s"
+                                  % repr(envelope))
+        fingerprint, data = envelope
+        if fingerprint != cls._compact_root().schema_fingerprint():
+            raise LoadFailedError("Schema fingerprint mismatch: expected %s, got %s"
+                                  % (cls._compact_root().schema_fingerprint(),
+                                     repr(fingerprint)))
+        return cls.loads_dict(data, env_type="json_compact")
+
+    @classmethod
+    def _compact_root(cls):
+        u'fingerprint를 계산하는 클래스. 추상 클래스 계층에서는 그 root다.'
+        return cls
+
+    @classmethod
+    def loads_binary(cls, data):
+        u'dumps_binary()의 역.'
+        from binary import loads_binary
+        return loads_binary(cls, data)
+
+    @classmethod
+    def iter_loads_jsonl(cls, fileobj, compression="infer", interner=None):
+        u'''
+        JSON lines 파일에서 객체를 하나씩 load해 yield한다.
+        fileobj may also be a path; see stream.open_stream() for compression.
+        Errors carry the line number in their lineno attribute. interner is
+        as in loads_dict(); True shares one table over the file.
+        '''
+        intern = _interning(interner) if interner is not None else None
+        for lineno, line in iter_lines(fileobj, compression):
+            obj = cls._loads_json_line(lineno, line)
+            yield intern(obj) if intern is not None else obj
+
+    @classmethod
+    def _loads_json_line(cls, lineno, line):
+        try:
+            try:
+                json_dict = json.loads(line)
+            except ValueError as exc:
+                raise LoadFailedError("Invalid JSON: %s" % exc)
+            return cls.loads_json_dict(json_dict)
+        except MappingFailedError as exc:
+            exc.lineno = lineno
+            raise
+
+    @classmethod
+    def jsonl_feeder(cls, errors="raise"):
+        u'''
+        event loop에서 쓰는 JSON lines loader. 소켓 등에서 읽은 chunk를
+        feed()할 때마다 완성된 줄들의 객체를 리턴하며, 입력을 기다리며
+        block하지 않는다. Call close() at the end of input for the last line.
+        errors is as in loads_many(), with line numbers in place of indexes.
+        With "raise", records around a bad line are kept and returned by the
+        next feed() or close().
+        '''
+        return JSONLinesFeeder(cls, errors)
+
+    @classmethod
+    def loads_many_async(cls, dicts, env_type="object", errors="raise",
+                         pool=None, callback=None):
+        u'''
+        loads_many()를 thread pool에서 돌리고 AsyncResult를 리턴한다.
+        Large payloads then don't stall the caller's event loop thread.
+        pool defaults to a shared single-thread ThreadPool.
+        '''
+        if pool is None:
+            pool = _default_thread_pool()
+        return pool.apply_async(cls.loads_many, (dicts, env_type, errors),
+                                callback=callback)
+
+    @classmethod
+    def iter_loads_json_array(cls, fileobj, path=(), chunk_size=65536,
+                              compression="infer"):
+        u'''
+        하나의 큰 JSON array의 원소들을 파싱되는 대로 load해 yield한다.
+        path is a sequence of keys leading to the array inside nested
+        objects, e.g. ("data", "items"). Errors are scoped like
+        "data.items[3].name".
+        '''
+        values = iter_json_array(fileobj, path, chunk_size, compression)
+        idx = 0
+        while True:
+            try:
+                try:
+                    json_dict = next(values)
+                except StopIteration:
+                    return
+                except KeyError as exc:
+                    raise LoadFailedError("Key path not found: %s" % exc)
+                except ValueError as exc:
+                    err = LoadFailedError("Invalid JSON: %s" % exc)
+                    err.wrap_with_scope(u"[%d]" % idx)
+                    raise err
+                else:
+                    try:
+                        obj = cls.loads_json_dict(json_dict)
+                    except MappingFailedError as exc:
+                        exc.wrap_with_scope(u"[%d]" % idx)
+                        raise
+            except MappingFailedError as exc:
+                for key in reversed(path):
+                    exc.wrap_with_scope(key)
+                raise
+            yield obj
+            idx += 1
+
+    @classmethod
+    def build_jsonl_index(cls, path, key=None, index_path=None):
+        u'''
+        path의 JSON lines 파일에 대한 sidecar index를 만든다. key is the name
+        of an attribute to look records up by; see stream.build_jsonl_index().
+        '''
+        if key is not None and key not in cls.type_signature():
+            raise ValueError("%s has no attribute %s" % (cls.__name__, repr(key)))
+        try:
+            return build_jsonl_index(path, key, index_path)
+        except ValueError as exc:
+            if not hasattr(exc, "lineno"):
+                raise
+            err = LoadFailedError(str(exc))
+            err.lineno = exc.lineno
+            raise err
+
+    @classmethod
+    def open_jsonl_index(cls, path, index_path=None):
+        u'build_jsonl_index()로 index된 파일의 record들을 on demand로 load한다.'
+        return IndexedRecords(cls, IndexedJSONLines(path, index_path))
+
+    @classmethod
+    def dump_jsonl(cls, objs, fileobj, compression="infer"):
+        u'objs를 한 줄에 하나씩 JSON으로 쓰고, 쓴 줄의 수를 리턴한다.'
+        stream, should_close = open_stream(fileobj, "wb", compression)
+        lineno = 0
+        try:
+            for lineno, obj in enumerate(objs, 1):
+                try:
+                    line = obj.dumps_json()
+                except MappingFailedError as exc:
+                    exc.lineno = lineno
+                    raise
+                stream.write(line)
+                stream.write("\n")
+        finally:
+            if should_close:
+                stream.close()
+        return lineno
 
     def dumps_dict(self, env_type="object"):
         adapter = self.get_attr_adapter()
@@ -222,8 +1157,68 @@ class AttrObject(object):
     def dumps_json_dict(self):
         return self.dumps_dict(env_type="json")
 
-    def dumps_json(self):
-        return json.dumps(self.dumps_json_dict())
+    @classmethod
+    def dumps_many(cls, objs, env_type="object", errors="raise"):
+        u'객체들을 차례로 dump해 list로 리턴한다. errors는 loads_many()와 같다.'
+        dumpers = {}
+        def dump(obj):
+            obj_type = type(obj)
+            try:
+                dumper = dumpers[obj_type]
+            except KeyError:
+                if not isinstance(obj, cls):
+                    raise DumpFailedError('Expected an instance of %s, got %s'
+                                          % (repr(cls), repr(obj)))
+                dumper = dumpers[obj_type] = obj._get_compiled_dumper(env_type)
+            return dumper(obj)
+        return _map_with_policy(dump, objs, errors)
+
+    def dumps_json(self, compact=False):
+        u'''
+        compact가 켜지면 [schema fingerprint, json_compact array] 를 쓴다.
+        loads_json(s, compact=True) rejects a payload whose fingerprint
+        doesn't match the reader's classes.
+        '''
+        if compact:
+            return json.dumps([self._compact_root().schema_fingerprint(),
+                               self.dumps_dict(env_type="json_compact")],
+                              separators=(",", ":"))
+        return _json_encoder.encode(self.dumps_json_dict())
+
+    def iter_dumps_json(self, encoder=None, chunk_size=65536):
+        u'''
+        dumps_json()과 같은 JSON을 chunk_size 정도의 조각으로 yield한다.
+        Fields are dumped one at a time and lists element by element, so
+        neither the whole dumped dict nor the whole string is built.
+        encoder defaults to the one set by set_json_encoder().
+        '''
+        encoder = _json_encoder if encoder is None else _as_json_encoder(encoder)
+        buf = []
+        size = 0
+        for chunk in _iter_encode_object(self, encoder):
+            buf.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                yield "".join(buf)
+                buf = []
+                size = 0
+        if buf:
+            yield "".join(buf)
+
+    def dump_json(self, fileobj, encoder=None, compression="infer"):
+        u'iter_dumps_json()의 결과를 fileobj(또는 path)에 바로 쓴다.'
+        stream, should_close = open_stream(fileobj, "wb", compression)
+        try:
+            for chunk in self.iter_dumps_json(encoder):
+                stream.write(chunk)
+        finally:
+            if should_close:
+                stream.close()
+
+    def dumps_binary(self):
+        u'binary 모듈의 schema 기반 binary format으로 dump한다.'
+        from binary import dumps_binary
+        return dumps_binary(self)
 
     def to_dict(self):
         return self.dumps_dict()
@@ -270,11 +1265,646 @@ class AttrObject(object):
         return False
 
 
+def _load_chunk(task):
+    cls, start, chunk, env_type, raw_json, dump, errors = task
+    def load(record):
+        if raw_json:
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                raise LoadFailedError("Invalid JSON: %s" % exc)
+        obj = cls.loads_dict(record, env_type)
+        if dump is not None:
+            return obj.dumps_dict(dump)
+        return obj
+    return _map_with_policy(load, chunk, errors, start), errors
+
+
+def _check_errors_policy(errors):
+    if not (isinstance(errors, list) or errors in ("raise", "skip")):
+        raise ValueError('errors should be "raise", "skip" or a list, got %s'
+                         % repr(errors))
+
+
+def _map_with_policy(func, items, errors, start=0):
+    _check_errors_policy(errors)
+    result = []
+    append = result.append
+    for idx, item in enumerate(items, start):
+        try:
+            append(func(item))
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(u"[%d]" % idx)
+            if errors == "raise":
+                raise
+            if errors != "skip":
+                errors.append((idx, exc))
+    return result
+
+
+def _interning(interner):
+    u'interner 옵션을 obj -> obj 함수로 바꾼다.'
+    from interning import InternTable, intern_object
+    table = InternTable() if interner is True else interner
+    return lambda obj: intern_object(obj, table)
+
+
+def _compose(outer, inner):
+    return lambda value: outer(inner(value))
+
+
+def _unwrap_optional(attr):
+    if isinstance(attr, (OptionalAttr, NoneableAttr)):
+        return Attr.coerce(attr.wrapped_attr)
+    return attr
+
+
+def _wrap_with_scopes(exc, scope):
+    for name in reversed(scope):
+        exc.wrap_with_scope(name)
+
+
+def _load_lazy(attrobj_cls, val, env_type, scope):
+    if not isinstance(val, dict):
+        try:
+            return attrobj_cls.get_attr_adapter().loads(val, env_type)
+        except MappingFailedError as exc:
+            _wrap_with_scopes(exc, scope)
+            raise
+
+    key = None
+    try:
+        clazz = attrobj_cls.guess_class(val)
+        obj = clazz.__new__(clazz)
+        if not (hasattr(obj, "__dict__") and _install_lazy_getattr(clazz)):
+            return attrobj_cls.get_attr_adapter().loads(val, env_type)
+        pending = {}
+        loaded = {}
+        for key, attr in clazz.type_signature().items():
+            try:
+                raw = val[key]
+            except KeyError:
+                loaded[key] = attr.key_not_present(key, env_type)
+                continue
+            if raw is not None and isinstance(_unwrap_optional(attr),
+                                              (AttrObjectAdapter, ListAttr,
+                                               DictAttr)):
+                pending[key] = raw
+            else:
+                loaded[key] = attr.loads(raw, env_type)
+    except MappingFailedError as exc:
+        if key is not None:
+            exc.wrap_with_scope(key)
+        _wrap_with_scopes(exc, scope)
+        raise
+
+    obj.__dict__["_lazy_state"] = (pending, env_type, scope)
+    loaded["__raw__"] = True
+    obj.__init__(**loaded)
+    return obj
+
+
+def _lazy_getattr(self, name):
+    u'loads_lazy()가 쓴 클래스의 __getattr__. pending인 attribute를 load한다.'
+    if name.startswith("__"):
+        raise AttributeError(name)
+    try:
+        pending, env_type, scope = self.__dict__["_lazy_state"]
+        raw = pending[name]
+    except (AttributeError, KeyError):
+        raise AttributeError("'%s' object has no attribute '%s'"
+                             % (type(self).__name__, name))
+    attr = type(self).type_signature()[name]
+    try:
+        value = _materialize(attr, raw, env_type, scope + (name, ))
+    except MappingFailedError as exc:
+        # the path from the loads_lazy() root is complete; callers that
+        # reach here while dumping must not add their own scopes to it
+        exc.scope_closed = True
+        raise
+    self.__dict__[name] = value
+    del pending[name]
+    return value
+
+
+def _install_lazy_getattr(attrobj_cls):
+    u'''
+    attrobj_cls에 _lazy_getattr를 단다. Only classes that loads_lazy() has
+    built instances of get the hook. Returns False for classes with a
+    __getattr__ of their own, which are then loaded eagerly.
+    '''
+    getattr_hook = getattr(attrobj_cls, "__getattr__", None)
+    if getattr_hook is None:
+        attrobj_cls.__getattr__ = _lazy_getattr
+        return True
+    return getattr(getattr_hook, "im_func", None) is _lazy_getattr
+
+
+def _materialize(attr, raw, env_type, scope):
+    inner = _unwrap_optional(attr)
+    if isinstance(inner, AttrObjectAdapter):
+        return _load_lazy(inner.attrobj_cls, raw, env_type, scope)
+    if (isinstance(inner, ListAttr) and len(inner.attrs) == 1
+            and isinstance(inner.attrs[0], AttrObjectAdapter)
+            and isinstance(raw, list)):
+        item_cls = inner.attrs[0].attrobj_cls
+        return [_load_lazy(item_cls, item, env_type, scope + (u"[%d]" % idx, ))
+                for idx, item in enumerate(raw)]
+    try:
+        return attr.loads(raw, env_type)
+    except MappingFailedError as exc:
+        _wrap_with_scopes(exc, scope)
+        raise
+
+
+class _FunctionJSONEncoder(object):
+    def __init__(self, dumps):
+        self.encode = dumps
+
+
+def _as_json_encoder(encoder):
+    if hasattr(encoder, "encode"):
+        return encoder
+    elif isCallable(encoder):
+        return _FunctionJSONEncoder(encoder)
+    raise TypeError("Expected a JSON encoder or a dumps function, got %s"
+                    % repr(encoder))
+
+
+_json_encoder = json.JSONEncoder()
+
+def set_json_encoder(encoder=None):
+    u'''
+    dumps_json(), iter_dumps_json(), dump_json(), dump_jsonl()이 쓰는 encoder를
+    바꾼다. encoder is anything with encode(obj) -> str, such as a
+    json.JSONEncoder with tuned separators, or a plain dumps function of a
+    third-party library. None restores the default json.JSONEncoder().
+    '''
+    global _json_encoder
+    if encoder is None:
+        encoder = json.JSONEncoder()
+    _json_encoder = _as_json_encoder(encoder)
+
+
+def _iter_encode_object(obj, encoder):
+    encode = encoder.encode
+    item_separator = getattr(encoder, "item_separator", ", ")
+    key_separator = getattr(encoder, "key_separator", ": ")
+    yield "{"
+    separator = ""
+    extra = {}
+    obj.inject_extra(extra)
+    for key, value in extra.items():
+        yield separator + encode(key) + key_separator + encode(value)
+        separator = item_separator
+    for key, attr in type(obj).type_signature().items():
+        yield separator + encode(key) + key_separator
+        separator = item_separator
+        try:
+            for chunk in _iter_encode_value(attr, getattr(obj, key), encoder):
+                yield chunk
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(key)
+            raise
+    yield "}"
+
+
+def _iter_encode_value(attr, value, encoder):
+    if isinstance(attr, (OptionalAttr, NoneableAttr)) and value is not None:
+        attr = Attr.coerce(attr.wrapped_attr)
+
+    if isinstance(attr, AttrObjectAdapter) and isinstance(value, AttrObject):
+        if not isinstance(value, attr.attrobj_cls):
+            raise DumpFailedError("Expected an instance of %s, got %s"
+                                  % (repr(attr.attrobj_cls), repr(value)))
+        for chunk in _iter_encode_object(value, encoder):
+            yield chunk
+    elif (isinstance(attr, ListAttr) and len(attr.attrs) == 1
+          and isinstance(value, (list, tuple))):
+        item_attr = attr.attrs[0]
+        separator = getattr(encoder, "item_separator", ", ")
+        yield "["
+        for idx, item in enumerate(value):
+            if idx:
+                yield separator
+            try:
+                for chunk in _iter_encode_value(item_attr, item, encoder):
+                    yield chunk
+            except MappingFailedError as exc:
+                exc.wrap_with_scope(u"[%d]" % idx)
+                raise
+        yield "]"
+    else:
+        yield encoder.encode(attr.dumps(value, "json"))
+
+
+def _describe_schema(attrobj_cls, seen):
+    if attrobj_cls in seen:
+        return "#%d" % seen.index(attrobj_cls) # recursive schema
+    seen.append(attrobj_cls)
+    signature = attrobj_cls.type_signature()
+    parts = ["{"]
+    if attrobj_cls._compact_type_tagged():
+        parts.append(repr(attrobj_cls._get_type_value()) + ";")
+    for key in compact_keys(signature):
+        parts.append("%s:%s," % (key, _describe_value(signature[key], seen)))
+    parts.append("}")
+    registry = getattr(attrobj_cls, "_type_registry", None) or {}
+    for type_value in sorted(registry):
+        if registry[type_value] is not attrobj_cls:
+            parts.append(_describe_schema(registry[type_value], seen))
+    return "".join(parts)
+
+
+def _describe_value(value, seen):
+    u'''
+    schema_fingerprint()에 쓰는, process가 달라도 같은 설명.
+    Values that could only be described by their repr() (which may carry a
+    memory address) raise TypeError.
+    '''
+    if isinstance(value, AttrObjectAdapter):
+        return _describe_schema(value.attrobj_cls, seen)
+    elif isinstance(value, (DictAttr, SignatureDictAttr)):
+        signature = (value._signature if isinstance(value, DictAttr)
+                     else value.signature)
+        return "%s(%s)" % (type(value).__name__, ",".join(
+            "%s:%s" % (key, _describe_value(signature[key], seen))
+            for key in sorted(signature)))
+    elif isinstance(value, AttrObject):
+        return "%s(%s)" % (type(value).__name__, ",".join(
+            "%s=%s" % (key, _describe_value(item, seen))
+            for key, item in sorted(value.items())))
+    elif isinstance(value, (list, tuple)):
+        return "[%s]" % ",".join(_describe_value(item, seen) for item in value)
+    elif isinstance(value, dict):
+        return "{%s}" % ",".join(
+            "%s:%s" % (_describe_value(key, seen), _describe_value(item, seen))
+            for key, item in sorted(value.items()))
+    elif isinstance(value, sre_pattern_type):
+        return "re(%r,%d)" % (value.pattern, value.flags)
+    elif isinstance(value, predefined_literal_types):
+        return repr(value)
+    elif hasattr(value, "__name__"): # types and default factories
+        return value.__name__
+    raise TypeError("%s has no stable description for schema_fingerprint()"
+                    % repr(value))
+
+
+class JSONLinesFeeder(object):
+    def __init__(self, attrobj_cls, errors="raise"):
+        _check_errors_policy(errors)
+        self.attrobj_cls = attrobj_cls
+        self.errors = errors
+        self.lines = LineBuffer()
+        self.ready = deque() # (lineno, line) not loaded yet
+        self.loaded = [] # not returned yet
+
+    def feed(self, data):
+        self.ready.extend(self.lines.feed(data))
+        return self._drain()
+
+    def close(self):
+        self.ready.extend(self.lines.close())
+        return self._drain()
+
+    def _drain(self):
+        while self.ready:
+            lineno, line = self.ready.popleft()
+            try:
+                self.loaded.append(self.attrobj_cls._loads_json_line(lineno,
+                                                                     line))
+            except MappingFailedError as exc:
+                if self.errors == "raise":
+                    raise
+                if self.errors != "skip":
+                    self.errors.append((lineno, exc))
+        result, self.loaded = self.loaded, []
+        return result
+
+
+class IndexedRecords(object):
+    u'''
+    records[n]은 n번째 record를, records.get(key)는 index key로 찾은 record를
+    loads_json()으로 load한다. Use as a context manager or call close().
+    '''
+    def __init__(self, attrobj_cls, lines):
+        self.attrobj_cls = attrobj_cls
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, recno):
+        line = self.lines.line(recno)
+        try:
+            try:
+                return self.attrobj_cls.loads_json(line)
+            except MappingFailedError:
+                raise
+            except ValueError as exc:
+                raise LoadFailedError("Invalid JSON: %s" % exc)
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(u"[%d]" % recno)
+            raise
+
+    def get(self, key, default=None):
+        try:
+            recno = self.lines.recno_of(key)
+        except KeyError:
+            return default
+        return self[recno]
+
+    def close(self):
+        self.lines.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_thread_pool = None
+_thread_pool_lock = threading.Lock()
+
+def _default_thread_pool():
+    global _thread_pool
+    with _thread_pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPool(1)
+        return _thread_pool
+
+
+class SlottedAttrObject(AttrObject):
+    u'''
+    인스턴스가 __dict__ 대신 unified_attributes()에서 유도된 __slots__를 쓴다.
+    Each subclass gets slots for the attributes it adds on top of its
+    bases. Extra per-instance state must be declared in __slots__ of the
+    class body, and two slotted bases that both add attributes cannot be
+    combined (a CPython layout restriction).
+    '''
+    __slotted__ = True
+    __slots__ = ()
+
+
+class TrackedAttrObject(AttrObject):
+    u'''
+    __setattr__로 바뀐 attribute들을 기억해, dump할 때 바뀌지 않은 attribute의
+    dump 결과를 env_type별로 재사용한다. dumps_delta() dumps only the keys
+    changed since the previous dumps_delta().
+
+    Only reassignment is seen: after changing a value in place (e.g.
+    appending to a list attribute) call mark_changed(key). Fields holding
+    TrackedAttrObjects are not cached here, since those keep their own cache.
+    Such a field counts as changed while one of its tracked children has
+    changes, and dumps_delta() then dumps it whole and forgets the changes
+    of the children too. Treat the returned dicts as read-only; they share
+    cached sub-trees.
+    '''
+    __slots__ = ("_tracked_cache", "_tracked_changed")
+
+    def __new__(cls, *args, **kwds):
+        self = super(TrackedAttrObject, cls).__new__(cls)
+        object.__setattr__(self, "_tracked_cache", {})
+        object.__setattr__(self, "_tracked_changed", set())
+        return self
+
+    def __getstate__(self):
+        state = super(TrackedAttrObject, self).__getstate__()
+        state.pop("_tracked_cache", None)
+        state.pop("_tracked_changed", None)
+        return state
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "_tracked_cache", {})
+        object.__setattr__(self, "_tracked_changed", set())
+        super(TrackedAttrObject, self).__setstate__(state)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        self.mark_changed(name)
+
+    def mark_changed(self, *names):
+        for cache in self._tracked_cache.itervalues():
+            for name in names:
+                cache.pop(name, None)
+        self._tracked_changed.update(names)
+
+    def changed_keys(self):
+        u'''
+        마지막 dumps_delta() 이후 바뀐 attribute들. Includes the fields whose
+        tracked children (or their children) have changed.
+        '''
+        signature = self.type_signature()
+        changed = set(name for name in self._tracked_changed
+                      if name in signature)
+        for name in self._tracked_fields():
+            if name not in changed and any(
+                    child.changed_keys() for child
+                    in _tracked_children(getattr(self, name, None))):
+                changed.add(name)
+        return changed
+
+    def dumps_delta(self, env_type="object"):
+        u'''
+        마지막 dumps_delta() 이후 바뀐 attribute들만 dump한다. A field changed
+        through its tracked children is dumped whole, and the changes of
+        those children are forgotten along with this object's.
+        '''
+        field_dumpers = self._get_field_dumpers(env_type)
+        result = self._dump_fields(env_type, field_dumpers, self.changed_keys())
+        self._forget_changes()
+        return result
+
+    def _forget_changes(self):
+        self._tracked_changed.clear()
+        for name in self._tracked_fields():
+            for child in _tracked_children(getattr(self, name, None)):
+                child._forget_changes()
+
+    @classmethod
+    def _tracked_fields(cls):
+        u'TrackedAttrObject를 담을 수 있는 attribute들.'
+        key = "tracked_fields"
+        try:
+            return cls._compiled_dumpers[key]
+        except KeyError:
+            cls._compiled_dumpers[key] = tuple(
+                name for name, attr in cls.type_signature().items()
+                if _holds_tracked(attr))
+            return cls._compiled_dumpers[key]
+
+    @classmethod
+    def _get_field_dumpers(cls, env_type):
+        key = ("fields", env_type)
+        try:
+            return cls._compiled_dumpers[key]
+        except KeyError:
+            field_dumpers = compile_field_dumpers(cls, env_type)
+            signature = cls.type_signature()
+            # (dumper, whether the dumped value may be cached)
+            cls._compiled_dumpers[key] = dict(
+                (name, (dumper, not _holds_tracked(signature[name])))
+                for name, dumper in field_dumpers.items())
+            return cls._compiled_dumpers[key]
+
+    @classmethod
+    def _get_compiled_dumper(cls, env_type):
+        if env_type == "json_compact":
+            return super(TrackedAttrObject, cls)._get_compiled_dumper(env_type)
+        try:
+            return cls._compiled_dumpers[env_type]
+        except KeyError:
+            field_dumpers = cls._get_field_dumpers(env_type)
+            def dump(o):
+                r = o._dump_fields(env_type, field_dumpers, field_dumpers)
+                o.inject_extra(r)
+                return r
+            cls._compiled_dumpers[env_type] = dump
+            return dump
+
+    def _dump_fields(self, env_type, field_dumpers, names):
+        try:
+            cache = self._tracked_cache[env_type]
+        except KeyError:
+            cache = self._tracked_cache[env_type] = {}
+        r = {}
+        for name in names:
+            try:
+                r[name] = cache[name]
+            except KeyError:
+                dumper, cacheable = field_dumpers[name]
+                r[name] = dumper(getattr(self, name))
+                if cacheable:
+                    cache[name] = r[name]
+        return r
+
+
+def _freeze(obj):
+    object.__setattr__(obj, "_frozen", True)
+
+
+class FrozenAttrObject(AttrObject):
+    u'''
+    생성(__postinit__까지) 이후에는 attribute를 바꿀 수 없는 AttrObject.
+    __hash__ is computed once on first use, and dumps_dict()/dumps_json()
+    results are cached per env_type, so the returned dicts must be treated
+    as read-only. Values are not copied: mutating a list or dict held by a
+    frozen object in place leaves the hash and the cached dumps stale.
+    '''
+    __frozen__ = True
+    __slots__ = ("_frozen", "_frozen_hash", "_frozen_dumps")
+
+    def __new__(cls, *args, **kwds):
+        self = super(FrozenAttrObject, cls).__new__(cls)
+        object.__setattr__(self, "_frozen", False)
+        object.__setattr__(self, "_frozen_hash", None)
+        object.__setattr__(self, "_frozen_dumps", {})
+        return self
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("Cannot set '%s': %s is frozen"
+                                 % (name, type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise AttributeError("Cannot delete '%s': %s is frozen"
+                                 % (name, type(self).__name__))
+        object.__delattr__(self, name)
+
+    def __hash__(self):
+        if self._frozen_hash is None:
+            object.__setattr__(self, "_frozen_hash", hash(
+                (type(self), ) + tuple(_hashable(getattr(self, key))
+                                       for key in sorted(self.type_signature()))
+            ))
+        return self._frozen_hash
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __getstate__(self):
+        state = super(FrozenAttrObject, self).__getstate__()
+        for key in FrozenAttrObject.__slots__:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "_frozen_hash", None)
+        object.__setattr__(self, "_frozen_dumps", {})
+        for key, value in state.iteritems():
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, "_frozen", True)
+
+    @classmethod
+    def _get_compiled_dumper(cls, env_type):
+        key = ("frozen", env_type)
+        try:
+            return cls._compiled_dumpers[key]
+        except KeyError:
+            dumper = super(FrozenAttrObject, cls)._get_compiled_dumper(env_type)
+            def dump(o):
+                try:
+                    return o._frozen_dumps[env_type]
+                except KeyError:
+                    r = dumper(o)
+                    if o._frozen:
+                        o._frozen_dumps[env_type] = r
+                    return r
+            cls._compiled_dumpers[key] = dump
+            return dump
+
+    def dumps_json(self, compact=False):
+        key = ("dumps_json", compact or _json_encoder)
+        try:
+            return self._frozen_dumps[key]
+        except KeyError:
+            r = super(FrozenAttrObject, self).dumps_json(compact)
+            if self._frozen:
+                self._frozen_dumps[key] = r
+            return r
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_hashable, value))
+    if isinstance(value, dict):
+        return frozenset((k, _hashable(v)) for k, v in value.iteritems())
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, AttrObject) and not isinstance(value, FrozenAttrObject):
+        # hashed by value like __eq__ compares it
+        return (type(value), ) + tuple(_hashable(getattr(value, key))
+                                       for key in sorted(value.type_signature()))
+    return value
+
+
+def _tracked_children(value):
+    u'value가 담은 TrackedAttrObject들. list는 item별로 찾는다.'
+    if isinstance(value, TrackedAttrObject):
+        return [value]
+    if isinstance(value, list):
+        return [child for item in value for child in _tracked_children(item)]
+    return []
+
+
+def _holds_tracked(attr):
+    u'attr의 값이 TrackedAttrObject(들)일 수 있는지.'
+    if isinstance(attr, (OptionalAttr, NoneableAttr)):
+        attr = Attr.coerce(attr.wrapped_attr)
+    if isinstance(attr, ListAttr):
+        return any(_holds_tracked(item_attr) for item_attr in attr.attrs)
+    return (isinstance(attr, AttrObjectAdapter) and
+            issubclass(attr.attrobj_cls, TrackedAttrObject))
+
 
 class Attr(AttrObject):
     _fast_coerce_chain = {}
     _fast_value_coerce_chain = {}
     _coerce_chain = {}
+    _coerce_chain_cache = {} # type -> chains of _coerce_chain that apply to it
 
     @classmethod
     def _set_coerce_rule(cls, fast, is_value, *args):
@@ -293,6 +1923,8 @@ class Attr(AttrObject):
                 if arg not in chain_dict:
                     chain_dict[arg] = []
                 chain_dict[arg].append(chain)
+            if not fast:
+                cls._coerce_chain_cache.clear()
             return chain
         return wrapper
 
@@ -314,29 +1946,31 @@ class Attr(AttrObject):
             return obj
 
         type_of_obj = type(obj)
-        try:
-            hash(obj)
-        except TypeError:
-            pass
-        else:
-            for chain in cls._fast_value_coerce_chain.get(obj, ()):
-                retval = chain(obj)
-                if retval is not None:
-                    return retval
+        if type_of_obj.__hash__ is not None: # list, dict, ...
+            try:
+                hash(obj)
+            except TypeError:
+                pass
+            else:
+                for chain in cls._fast_value_coerce_chain.get(obj, ()):
+                    retval = chain(obj)
+                    if retval is not None:
+                        return retval
 
         for chain in cls._fast_coerce_chain.get(type_of_obj, ()):
             retval = chain(obj)
             if retval is not None:
                 return retval
 
-        # slow loop
-        for base_type, chains in cls._coerce_chain.items():
-            if isinstance(obj, base_type):
-                for chain in chains:
-                    retval = chain(obj)
-                    if retval is not None:
-                        return retval
-        
+        try:
+            chains = cls._coerce_chain_cache[type_of_obj]
+        except KeyError:
+            chains = cls._resolve_coerce_chains(type_of_obj)
+        for chain in chains:
+            retval = chain(obj)
+            if retval is not None:
+                return retval
+
         # treat it as lambda function and evaluate it
         if inspect.isfunction(obj):
             # evaluate a lambda
@@ -344,6 +1978,31 @@ class Attr(AttrObject):
 
         raise TypeError("No type coersion rule for the value %s."
                         " Did you forget to have it inherit either AttrObject or Attr?"%repr(obj))
+
+    @classmethod
+    def _resolve_coerce_chains(cls, type_of_obj):
+        u'''
+        type_of_obj의 MRO 순서로 coerce_rule들을 모아 캐시한다.
+        Base types that are not in the MRO but still match (ABCs with
+        registered virtual subclasses) come last. The cache is cleared when a
+        new coerce_rule is registered, but not when an ABC registers a new
+        virtual subclass.
+        '''
+        chains = []
+        matched_types = set()
+        for base_type in inspect.getmro(type_of_obj):
+            if base_type in cls._coerce_chain:
+                chains.extend(cls._coerce_chain[base_type])
+                matched_types.add(base_type)
+
+        for base_type, base_chains in cls._coerce_chain.items():
+            if base_type not in matched_types and issubclass(type_of_obj, base_type):
+                chains.extend(base_chains)
+
+        chains = tuple(chains)
+        cls._coerce_chain_cache[type_of_obj] = chains
+        return chains
+
     @classmethod
     def coerce_dict(cls, dict_):
         return {key: cls.coerce(val) for key, val in dict_.items()}
@@ -358,18 +2017,64 @@ class Attr(AttrObject):
     def dumps(self, obj, env_type):
         return NotImplementedError
 
+    def validate(self, val, env_type, errors=None):
+        u'''
+        loads()가 실패할 값이면 MappingFailedError를 raise한다.
+        Containers append the errors of their items to `errors` instead of
+        raising when it is given.
+        '''
+        self.loads(val, env_type)
+
     def key_not_present(self, access_key, env_type):
         raise LoadFailedError("KeyError")
 
+    def validate_key_not_present(self, access_key, env_type):
+        self.key_not_present(access_key, env_type)
+
+
+def _validate_in_scope(attr, val, env_type, errors, scope):
+    u'scope가 int이면 list의 index로 취급한다.'
+    if errors is None:
+        try:
+            attr.validate(val, env_type)
+        except MappingFailedError as exc:
+            exc.wrap_with_scope(scope if isinstance(scope, basestring)
+                                else u"[%d]" % scope)
+            raise
+    else:
+        mark = len(errors)
+        try:
+            attr.validate(val, env_type, errors)
+        except MappingFailedError as exc:
+            errors.append(exc)
+        if len(errors) > mark:
+            if not isinstance(scope, basestring):
+                scope = u"[%d]" % scope
+            for idx in range(mark, len(errors)):
+                errors[idx].wrap_with_scope(scope)
+
 
 class AnyAttr(Attr):
     def loads(self, val, env_type):
         return val
 
+    def validate(self, val, env_type, errors=None):
+        pass
+
     def dumps(self, obj, env_type):
         return obj
 
 
+@SchemaCompiler.load_rule(AnyAttr)
+def any_load_rule(compiler, attr, src, depth):
+    return src
+
+
+@SchemaCompiler.dump_rule(AnyAttr)
+def any_dump_rule(compiler, attr, src, depth):
+    return src
+
+
 class AttrOfAttr(Attr):
     # Meta-level Attr
     def loads(self, val, env_type):
@@ -384,27 +2089,52 @@ def meta_attr_coerce_chain(obj):
     return AttrOfAttr()
 
 class AttrDecorator(Attr):
+    # get_wrapped_attr()의 결과가 인스턴스와 env_type에 의해서만 결정되지
+    # 않는 decorator는 이것을 False로 둔다.
+    cache_wrapped_attr = True
+
     def get_wrapped_attr(self, env_type):
         raise NotImplementedError
 
     def do_get_wrapped_attr(self, env_type):
-        return Attr.coerce(self.get_wrapped_attr(env_type))
+        if not self.cache_wrapped_attr:
+            return Attr.coerce(self.get_wrapped_attr(env_type))
+
+        try:
+            cache = self._wrapped_attr_cache
+        except AttributeError:
+            cache = self._wrapped_attr_cache = {}
 
+        try:
+            return cache[env_type]
+        except KeyError:
+            impl = cache[env_type] = Attr.coerce(self.get_wrapped_attr(env_type))
+            return impl
+
+    # wrap_loads, wrap_dumps and pre_loads may return PASS_THROUGH or a Skip
+    # instead of raising PassThrough or SkipAll. Raising still works.
     def wrap_loads(self, val, env_type):
-        raise PassThrough
+        return PASS_THROUGH
 
     def wrap_dumps(self, obj, env_type):
-        raise PassThrough
+        return PASS_THROUGH
 
     def loads(self, val, env_type):
         try:
-            self.pre_loads(val)
+            skip = self.pre_loads(val)
+            if type(skip) is Skip:
+                return skip.retval
             impl = self.do_get_wrapped_attr(env_type)
             preloaded_val = impl.loads(val, env_type)
             try:
-                return self.wrap_loads(preloaded_val, env_type)
+                loaded_val = self.wrap_loads(preloaded_val, env_type)
             except PassThrough:
                 return preloaded_val
+            if loaded_val is PASS_THROUGH:
+                return preloaded_val
+            elif type(loaded_val) is Skip:
+                return loaded_val.retval
+            return loaded_val
         except SkipAll as exc:
             return exc.retval
         except MappingFailedError as exc:
@@ -418,6 +2148,10 @@ class AttrDecorator(Attr):
                 dumped_obj = self.wrap_dumps(obj, env_type)
             except PassThrough:
                 dumped_obj = obj
+            if dumped_obj is PASS_THROUGH:
+                dumped_obj = obj
+            elif type(dumped_obj) is Skip:
+                return dumped_obj.retval
             dumpval = impl.dumps(dumped_obj, env_type)
             return dumpval
         except SkipAll as exc:
@@ -426,8 +2160,53 @@ class AttrDecorator(Attr):
             self.on_mapping_failure(exc)
             raise
 
+    def validate(self, val, env_type, errors=None):
+        if not self._validates_raw_value(env_type):
+            self.loads(val, env_type)
+            return
+        try:
+            skip = self.pre_loads(val)
+            if type(skip) is Skip:
+                return
+            impl = self.do_get_wrapped_attr(env_type)
+            impl.validate(val, env_type, errors)
+            self.wrap_validate(val, env_type, errors)
+        except SkipAll:
+            return
+        except MappingFailedError as exc:
+            self.on_mapping_failure(exc)
+            raise
+
+    def wrap_validate(self, val, env_type, errors=None):
+        u'''
+        wrap_loads()의 검사 부분. val은 wrapped attr가 load하기 전의 값이다.
+        Decorators that don't override this are validated through loads()
+        unless wrap_loads() can safely see the raw value; see
+        _validates_raw_value().
+        '''
+        try:
+            self.wrap_loads(val, env_type)
+        except PassThrough:
+            pass
+
+    def _validates_raw_value(self, env_type):
+        u'''
+        validate()가 load 없이 wrapped attr의 validate()와 wrap_validate()로
+        충분한지. True when wrap_loads() is the default, when wrap_validate()
+        is overridden, or for the decorators of this module whose wrapped
+        attr returns its input unchanged.
+        '''
+        cls = type(self)
+        if (cls.wrap_loads.im_func is AttrDecorator.wrap_loads.im_func or
+                cls.wrap_validate.im_func is not
+                AttrDecorator.wrap_validate.im_func):
+            return True
+        return (cls.__module__ == __name__ and
+                type(self.do_get_wrapped_attr(env_type)) in (SimpleTypeAttr,
+                                                             AnyAttr))
+
     def pre_loads(self, val):
-        pass
+        return None
 
     def on_mapping_failure(self, exc):
         pass
@@ -451,6 +2230,13 @@ class ListAttr(Attr):
     def __postinit__(self):
         self.attrs = Attr.coerce_list(self.attrs)
 
+    def validate(self, val, env_type, errors=None):
+        if not isinstance(val, Iterable):
+            raise LoadFailedError("Iterable expected, got %s"%repr(val))
+
+        for idx, (attr, val_item) in enumerate(izip(cycle(self.attrs), val)):
+            _validate_in_scope(attr, val_item, env_type, errors, idx)
+
     def loads(self, val, env_type):
         if not isinstance(val, Iterable):
             raise LoadFailedError("Iterable expected, got %s"%repr(val))
@@ -481,6 +2267,48 @@ def list_expr_coerce_chain(obj):
     return ListAttr(*obj)
 
 
+@SchemaCompiler.load_rule(ListAttr)
+def list_load_rule(compiler, attr, src, depth):
+    if len(attr.attrs) != 1:
+        return None
+
+    result = compiler.fresh("lst")
+    idx = compiler.fresh("i")
+    item = compiler.fresh("item")
+    compiler.emit(depth, "if not isinstance(%s, Iterable):" % src)
+    compiler.emit(depth + 1,
+                  "raise LoadFailedError('Iterable expected, got %%s' %% repr(%s))"
+                  % src)
+    compiler.emit(depth, "%s = []" % result)
+    compiler.emit(depth, "try:")
+    compiler.emit(depth + 1, "for %s, %s in enumerate(%s):" % (idx, item, src))
+    loaded_item = compiler.load_value(attr.attrs[0], item, depth + 2)
+    compiler.emit(depth + 2, "%s.append(%s)" % (result, loaded_item))
+    compiler.emit(depth, "except MappingFailedError as exc:")
+    compiler.emit(depth + 1, "exc.wrap_with_scope(u'[%%d]' %% %s)" % idx)
+    compiler.emit(depth + 1, "raise")
+    return result
+
+
+@SchemaCompiler.dump_rule(ListAttr)
+def list_dump_rule(compiler, attr, src, depth):
+    if len(attr.attrs) != 1:
+        return None
+
+    result = compiler.fresh("lst")
+    idx = compiler.fresh("i")
+    item = compiler.fresh("item")
+    compiler.emit(depth, "%s = []" % result)
+    compiler.emit(depth, "try:")
+    compiler.emit(depth + 1, "for %s, %s in enumerate(%s):" % (idx, item, src))
+    dumped_item = compiler.dump_value(attr.attrs[0], item, depth + 2)
+    compiler.emit(depth + 2, "%s.append(%s)" % (result, dumped_item))
+    compiler.emit(depth, "except MappingFailedError as exc:")
+    compiler.emit(depth + 1, "exc.wrap_with_scope(u'[%%d]' %% %s)" % idx)
+    compiler.emit(depth + 1, "raise")
+    return result
+
+
 class SimpleTypeAttr(Attr):
     attributes = {
         "*types": (lambda: ListAttr(
@@ -505,6 +2333,10 @@ class SimpleTypeAttr(Attr):
                               "%s doesn't match with types (%s)"
                               %(repr(val), ", ".join(map(repr, self.types))))
 
+    def validate(self, val, env_type, errors=None):
+        if not isinstance(val, self.types):
+            self.loads(val, env_type)
+
     def dumps(self, obj, env_type):
         if isinstance(obj, self.types):
             return obj
@@ -514,6 +2346,18 @@ class SimpleTypeAttr(Attr):
                               %", ".join(map(repr, self.types)))
 
 
+@SchemaCompiler.load_rule(SimpleTypeAttr)
+def simple_type_load_rule(compiler, attr, src, depth):
+    compiler.emit_type_check(src, attr.types, depth)
+    return src
+
+
+@SchemaCompiler.dump_rule(SimpleTypeAttr)
+def simple_type_dump_rule(compiler, attr, src, depth):
+    compiler.emit_dump_type_check(src, attr.types, depth)
+    return src
+
+
 class SignatureDictAttr(AttrDecorator):
     attributes = {
         "signature#0": SimpleTypeAttr(types=[AttributeSignature],
@@ -540,6 +2384,21 @@ class SignatureDictAttr(AttrDecorator):
             result[key] = obj
         return result
 
+    def wrap_validate(self, dict_, env_type, errors=None):
+        for key, attr in self.signature.items():
+            try:
+                val = dict_[key]
+            except KeyError:
+                try:
+                    attr.validate_key_not_present(key, env_type)
+                except MappingFailedError as exc:
+                    exc.wrap_with_scope(key)
+                    if errors is None:
+                        raise
+                    errors.append(exc)
+            else:
+                _validate_in_scope(attr, val, env_type, errors, key)
+
     def wrap_dumps(self, dict_, env_type):
         result = {}
         for key, attr in self.signature.items():
@@ -563,10 +2422,12 @@ class AttrObjectAdapter(Attr):
     def get_signature_dict_attr(self, attrobj_cls):
         assert isinstance(attrobj_cls, MetaAttrObject)
 
-        return SignatureDictAttr(
-            signature=attrobj_cls.type_signature(),
-            __bootstrap__=True
-        )
+        if attrobj_cls._cached_signature_dict_attr is None:
+            attrobj_cls._cached_signature_dict_attr = SignatureDictAttr(
+                signature=attrobj_cls.type_signature(),
+                __bootstrap__=True
+            )
+        return attrobj_cls._cached_signature_dict_attr
 
     def loads(self, val, env_type):
         if isinstance(val, AttrObject):
@@ -576,24 +2437,28 @@ class AttrObjectAdapter(Attr):
 
         elif isinstance(val, dict):
             clazz = self.attrobj_cls.extract_class(val)
-            sig_attr = self.get_signature_dict_attr(clazz)
-            loaded_dict = sig_attr.loads(val, env_type)
-            loaded_dict["__raw__"] = True
-            return clazz(**loaded_dict)
+            return clazz._get_compiled_builder(env_type)(val)
+        elif isinstance(val, list) and env_type == "json_compact":
+            clazz = self.attrobj_cls._compact_class(val)
+            return clazz._get_compiled_builder(env_type)(val)
         else:
             raise LoadFailedError('Expected an AttrObject or a dict, got %s'%repr(val))
 
+    def validate(self, val, env_type, errors=None):
+        if isinstance(val, dict):
+            clazz = self.attrobj_cls.guess_class(val)
+            sig_attr = self.get_signature_dict_attr(clazz)
+            sig_attr.validate(val, env_type, errors)
+        elif not isinstance(val, self.attrobj_cls):
+            self.loads(val, env_type)
+
     def dumps(self, obj, env_type):
-        sig_attr = self.get_signature_dict_attr(obj.__class__)
-        dumped_dict = sig_attr.dumps(obj.shallow_dict(), env_type)
-        obj.inject_extra(dumped_dict)
-        return dumped_dict
+        return obj._get_compiled_dumper(env_type)(obj)
 
 
     def update_obj(self, obj, args, kwds):
-        sig_attr = self.get_signature_dict_attr(obj.__class__)
         applied_dict = obj.type_signature().apply_arguments(args, kwds)
-        loaded_dict = sig_attr.loads(applied_dict, "object")
+        loaded_dict = obj._get_compiled_loader("object")(applied_dict)
         for k, v in loaded_dict.items():
             setattr(obj, k, v)
 
@@ -601,7 +2466,49 @@ class AttrObjectAdapter(Attr):
 @Attr.coerce_rule(type)
 def adapt_attrobj_coerce_chain(obj):
     if issubclass(obj, AttrObject):
-        return AttrObjectAdapter(obj)
+        return obj.get_attr_adapter()
+
+
+@SchemaCompiler.load_rule(AttrObjectAdapter)
+def attrobj_load_rule(compiler, attr, src, depth):
+    attrobj_cls = attr.attrobj_cls
+    result = compiler.fresh("obj")
+    clazz = compiler.fresh("clazz")
+    cls_const = compiler.const(attrobj_cls, "cls")
+    compiler.emit(depth, "if isinstance(%s, AttrObject):" % src)
+    compiler.emit(depth + 1, "if not isinstance(%s, %s):" % (src, cls_const))
+    compiler.emit(depth + 2, "raise LoadFailedError(%s)" % compiler.const(
+        'Attribute should be an instance of subclass of %s' % repr(attrobj_cls),
+        "msg"
+    ))
+    compiler.emit(depth + 1, "%s = %s" % (result, src))
+    compiler.emit(depth, "elif isinstance(%s, dict):" % src)
+    if attrobj_cls.extract_class.im_func is AttrObject.extract_class.im_func:
+        # bound on first use; the nested class may not be complete yet
+        builder = compiler.const([None], "builder")
+        compiler.emit(depth + 1, "if %s[0] is None:" % builder)
+        compiler.emit(depth + 2, "%s[0] = %s._get_compiled_builder(%r)"
+                                 % (builder, cls_const, compiler.env_type))
+        compiler.emit(depth + 1, "%s = %s[0](%s)" % (result, builder, src))
+    else:
+        compiler.emit(depth + 1, "%s = %s.extract_class(%s)" % (clazz, cls_const, src))
+        compiler.emit(depth + 1, "%s = %s._get_compiled_builder(%r)(%s)"
+                                 % (result, clazz, compiler.env_type, src))
+    if compiler.env_type == "json_compact":
+        compiler.emit(depth, "elif isinstance(%s, list):" % src)
+        compiler.emit(depth + 1, "%s = %s._compact_class(%s)" % (clazz, cls_const, src))
+        compiler.emit(depth + 1, "%s = %s._get_compiled_builder(%r)(%s)"
+                                 % (result, clazz, compiler.env_type, src))
+    compiler.emit(depth, "else:")
+    compiler.emit(depth + 1,
+                  "raise LoadFailedError('Expected an AttrObject or a dict, got %%s' %% repr(%s))"
+                  % src)
+    return result
+
+
+@SchemaCompiler.dump_rule(AttrObjectAdapter)
+def attrobj_dump_rule(compiler, attr, src, depth):
+    return "%s._get_compiled_dumper(%r)(%s)" % (src, compiler.env_type, src)
 
 class OptionalAttr(AttrWrapper):
     attributes = {
@@ -612,8 +2519,8 @@ class OptionalAttr(AttrWrapper):
 
     def wrap_dumps(self, obj, env_type):
         if obj is None:
-            raise SkipAll(obj)
-        return obj
+            return SKIP_NONE
+        return PASS_THROUGH
 
     def key_not_present(self, access_key, env_type):
         if isCallable(self.default):
@@ -621,6 +2528,32 @@ class OptionalAttr(AttrWrapper):
         else:
             return self.default
 
+    def validate_key_not_present(self, access_key, env_type):
+        pass
+
+
+@SchemaCompiler.load_rule(OptionalAttr)
+def optional_load_rule(compiler, attr, src, depth):
+    return compiler.load_value(Attr.coerce(attr.wrapped_attr), src, depth)
+
+
+@SchemaCompiler.missing_rule(OptionalAttr)
+def optional_missing_rule(compiler, attr):
+    if isCallable(attr.default):
+        return "%s()" % compiler.const(attr.default, "default")
+    return compiler.const(attr.default, "default")
+
+
+@SchemaCompiler.dump_rule(OptionalAttr)
+def optional_dump_rule(compiler, attr, src, depth):
+    result = compiler.fresh("opt")
+    compiler.emit(depth, "if %s is None:" % src)
+    compiler.emit(depth + 1, "%s = None" % result)
+    compiler.emit(depth, "else:")
+    dumped = compiler.dump_value(Attr.coerce(attr.wrapped_attr), src, depth + 1)
+    compiler.emit(depth + 1, "%s = %s" % (result, dumped))
+    return result
+
 
 
 predefined_literal_types = (int, long, float, basestring,
@@ -647,6 +2580,11 @@ def literal_value_coerce_chain(obj):
     return LiteralAttr(obj)
 
 
+@SchemaCompiler.dump_rule(LiteralAttr)
+def literal_dump_rule(compiler, attr, src, depth):
+    return src
+
+
 @Attr.fast_value_coerce_rule(bool, type(None), dict)
 def literal_type_coerce_chain(obj):
     return SimpleTypeAttr(obj)
@@ -663,6 +2601,18 @@ def integer_type_coerce_chain(obj):
     return IntegerAttr()
 
 
+@SchemaCompiler.load_rule(IntegerAttr)
+def integer_load_rule(compiler, attr, src, depth):
+    compiler.emit_type_check(src, (int, long), depth)
+    return src
+
+
+@SchemaCompiler.dump_rule(IntegerAttr)
+def integer_dump_rule(compiler, attr, src, depth):
+    compiler.emit_dump_type_check(src, (int, long), depth)
+    return src
+
+
 class FloatAttr(AttrDecorator):
     def get_wrapped_attr(self, env_type):
         return SimpleTypeAttr(int, long, float)
@@ -676,6 +2626,18 @@ def float_type_coerce_chain(obj):
     return FloatAttr()
 
 
+@SchemaCompiler.load_rule(FloatAttr)
+def float_load_rule(compiler, attr, src, depth):
+    compiler.emit_type_check(src, (int, long, float), depth)
+    return "float(%s)" % src
+
+
+@SchemaCompiler.dump_rule(FloatAttr)
+def float_dump_rule(compiler, attr, src, depth):
+    compiler.emit_dump_type_check(src, (int, long, float), depth)
+    return src
+
+
 class BytesAttr(AttrDecorator):
     attributes = {
         "encoding": (lambda: OptionalAttr(
@@ -729,15 +2691,53 @@ def unicode_type_coerce_chain(obj):
     return UnicodeAttr()
 
 
+@SchemaCompiler.load_rule(BytesAttr, UnicodeAttr)
+def string_load_rule(compiler, attr, src, depth):
+    compiler.emit_type_check(src, (bytes, unicode), depth)
+    if isinstance(attr, UnicodeAttr):
+        from_type, method = "bytes", "decode"
+    else:
+        from_type, method = "unicode", "encode"
+    compiler.emit(depth, "if isinstance(%s, %s):" % (src, from_type))
+    compiler.emit(depth + 1, "try:")
+    compiler.emit(depth + 2, "%s = %s.%s(%s)" % (
+        src, src, method, compiler.const(attr.encoding, "encoding")))
+    compiler.emit(depth + 1, "except UnicodeError as exc:")
+    compiler.emit(depth + 2, "raise LoadFailedError(str(exc))")
+    return src
+
+
+@SchemaCompiler.dump_rule(BytesAttr, UnicodeAttr)
+def string_dump_rule(compiler, attr, src, depth):
+    compiler.emit_dump_type_check(src, (bytes, unicode), depth)
+    return src
+
+
 class NoneableAttr(AttrWrapper):
     def pre_loads(self, val):
         if val is None:
-            raise SkipAll(val)
+            return SKIP_NONE
 
     def wrap_dumps(self, obj, env_type):
         if obj is None:
-            raise SkipAll(val)
-        return obj
+            return SKIP_NONE
+        return PASS_THROUGH
+
+
+@SchemaCompiler.load_rule(NoneableAttr)
+def noneable_load_rule(compiler, attr, src, depth):
+    result = compiler.fresh("noneable")
+    compiler.emit(depth, "if %s is None:" % src)
+    compiler.emit(depth + 1, "%s = None" % result)
+    compiler.emit(depth, "else:")
+    loaded = compiler.load_value(Attr.coerce(attr.wrapped_attr), src, depth + 1)
+    compiler.emit(depth + 1, "%s = %s" % (result, loaded))
+    return result
+
+
+@SchemaCompiler.dump_rule(NoneableAttr)
+def noneable_dump_rule(compiler, attr, src, depth):
+    return optional_dump_rule(compiler, attr, src, depth)
 
 
 
@@ -758,12 +2758,19 @@ class DatetimeAttr(Attr):
             raise LoadFailedError()
 
     def dumps(self, obj, env_type):
-        if env_type == "json":
+        if env_type in JSON_ENV_TYPES:
             return obj.strftime(self.format)
         else:
             return obj
 
 
+@SchemaCompiler.dump_rule(DatetimeAttr)
+def datetime_dump_rule(compiler, attr, src, depth):
+    if compiler.env_type in JSON_ENV_TYPES:
+        return "%s.strftime(%s)" % (src, compiler.const(attr.format, "format"))
+    return src
+
+
 
 
 
@@ -803,7 +2810,7 @@ class ChoiceAttr(AttrDecorator):
     def wrap_loads(self, val, env_type):
         if val not in self.choices:
             raise LoadFailedError("%s doesn't matched with choices: %s"%(repr(val), ", ".join(map(repr, self.choices))))
-        raise PassThrough
+        return PASS_THROUGH
 
 
 class StringChoiceAttr(ChoiceAttr):
@@ -812,6 +2819,22 @@ class StringChoiceAttr(ChoiceAttr):
     }
 
 
+@SchemaCompiler.load_rule(ChoiceAttr, StringChoiceAttr)
+def choice_load_rule(compiler, attr, src, depth):
+    suffix = compiler.const(" doesn't matched with choices: %s"
+                            % ", ".join(map(repr, attr.choices)), "msg")
+    compiler.emit(depth, "if %s not in %s:" % (
+        src, compiler.const(attr.choices, "choices")))
+    compiler.emit(depth + 1, "raise LoadFailedError(repr(%s) + %s)"
+                             % (src, suffix))
+    return src
+
+
+@SchemaCompiler.dump_rule(ChoiceAttr, StringChoiceAttr)
+def choice_dump_rule(compiler, attr, src, depth):
+    return src
+
+
 class DictAttr(AttrDecorator):
     attributes = {
         "arg#0": dict
@@ -841,11 +2864,34 @@ class ConstantAttr(Attr):
     def key_not_present(self, access_key, env_type):
         return self.value
 
+    def validate(self, val, env_type, errors=None):
+        pass
+
+    def validate_key_not_present(self, access_key, env_type):
+        pass
+
+
+@SchemaCompiler.missing_rule(ConstantAttr)
+def constant_missing_rule(compiler, attr):
+    return compiler.const(attr.value, "value")
+
+
+@SchemaCompiler.dump_rule(ConstantAttr)
+def constant_dump_rule(compiler, attr, src, depth):
+    return src
+
 
 class AbstractAttrObject(AttrObject):
+    __slots__ = ()
+
     type_key = "_type"
     type_value = None
 
+    # type value -> class, for this class and all of its subclasses.
+    # AbstractAttrObject itself has none, since unrelated hierarchies may
+    # reuse the same type values; it scans its subclasses instead.
+    _type_registry = None
+
     @classmethod
     def _get_type_value(cls):
         if cls.type_value is None:
@@ -854,17 +2900,67 @@ class AbstractAttrObject(AttrObject):
             return cls.type_value
 
     @classmethod
-    def extract_class(cls, loaded_dict):
+    def _register_class(cls):
+        if '_type_registry' in cls.__dict__:
+            return # AbstractAttrObject
+
+        cls._type_registry = {}
+        type_value = cls._get_type_value()
+        registries = [supcls.__dict__['_type_registry']
+                      for supcls in inspect.getmro(cls)
+                      if supcls.__dict__.get('_type_registry') is not None]
+        for registry in registries:
+            registered = registry.get(type_value)
+            if (registered is not None and
+                    (registered.__module__, registered.__name__) !=
+                    (cls.__module__, cls.__name__)): # not a redefinition
+                raise TypeError("Duplicate type value %s: %s and %s"
+                                % (repr(type_value), repr(registered), repr(cls)))
+        for registry in registries:
+            registry[type_value] = cls
+        _registry_generation[0] += 1
+
+    @classmethod
+    def guess_class(cls, dict_):
         try:
-            type_value = loaded_dict.pop(cls.type_key)
+            type_value = dict_[cls.type_key]
+            if cls._type_registry is not None:
+                return cls._type_registry[type_value]
+
             for subcls in _all_subclasses(cls):
                 if subcls._get_type_value() == type_value:
                     return subcls
             raise KeyError
-        except KeyError:
-            raise LoadFailedError('Failed to guess a concrete class from the type key %s; got %s'%(repr(cls.type_key), loaded_dict))
+        except (KeyError, TypeError): # TypeError: unhashable type value
+            raise LoadFailedError('Failed to guess a concrete class from the type key %s; got %s'%(repr(cls.type_key), dict_))
+
+    @classmethod
+    def extract_class(cls, loaded_dict):
+        subcls = cls.guess_class(loaded_dict)
+        del loaded_dict[cls.type_key]
+        return subcls
 
     @classmethod
     def inject_extra(cls, dumped_dict):
         dumped_dict[cls.type_key] = cls._get_type_value()
 
+    @classmethod
+    def _compact_type_tagged(cls):
+        return cls.inject_extra.im_func is AbstractAttrObject.inject_extra.im_func
+
+    @classmethod
+    def _compact_class(cls, array):
+        if not cls._compact_type_tagged():
+            return cls
+        if not array:
+            raise LoadFailedError("Expected a type value as the first item")
+        return cls.guess_class({cls.type_key: array[0]})
+
+    @classmethod
+    def _compact_root(cls):
+        roots = [supcls for supcls in inspect.getmro(cls)
+                 if issubclass(supcls, AbstractAttrObject)
+                 and supcls is not AbstractAttrObject]
+        return roots[-1] if roots else cls
+
+
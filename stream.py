@@ -0,0 +1,355 @@
+# coding: utf-8
+u'''
+File helpers for the streaming APIs of AttrObject.
+'''
+
+import os
+import re
+import sys
+import struct
+import json
+import gzip
+import mmap
+
+from array import array
+
+
+def _infer_compression(fileobj_or_path):
+    if isinstance(fileobj_or_path, gzip.GzipFile):
+        return None # already decompressing; its name still ends with .gz
+    name = fileobj_or_path
+    if not isinstance(name, basestring):
+        name = getattr(fileobj_or_path, "name", None)
+    if isinstance(name, basestring) and name.endswith(".gz"):
+        return "gzip"
+    return None
+
+
+def open_stream(fileobj_or_path, mode, compression="infer"):
+    u'''
+    (file object, 닫아야 하는지 여부)를 리턴한다.
+
+    fileobj_or_path is either a path or an already opened binary file
+    object. compression is None, "gzip", or "infer" (gzip when the path or
+    the file object's name ends with ".gz", unless it is a GzipFile). Only the gzip wrapper is
+    closed for file objects passed in; the caller keeps owning them.
+    '''
+    if compression == "infer":
+        compression = _infer_compression(fileobj_or_path)
+    if compression not in (None, "gzip"):
+        raise ValueError("Unsupported compression: %s" % repr(compression))
+
+    if isinstance(fileobj_or_path, basestring):
+        if compression == "gzip":
+            return gzip.open(fileobj_or_path, mode), True
+        return open(fileobj_or_path, mode), True
+
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj_or_path, mode=mode), True
+    return fileobj_or_path, False
+
+
+def iter_lines(fileobj_or_path, compression="infer"):
+    u'(줄 번호, 줄) 을 하나씩 yield한다. 빈 줄은 건너뛴다.'
+    stream, should_close = open_stream(fileobj_or_path, "rb", compression)
+    try:
+        for lineno, line in enumerate(stream, 1):
+            if line.strip():
+                yield lineno, line
+    finally:
+        if should_close:
+            stream.close()
+
+
+class LineBuffer(object):
+    u'''
+    push 방식의 iter_lines(). feed()된 데이터에서 완성된 (줄 번호, 줄)들을
+    리턴하고, 끝나지 않은 줄은 다음 feed()까지 들고 있는다.
+    '''
+    def __init__(self):
+        self.pending = []
+        self.lineno = 0
+
+    def feed(self, data):
+        lines = data.split("\n")
+        if len(lines) == 1:
+            if data:
+                self.pending.append(data)
+            return []
+        lines[0] = "".join(self.pending) + lines[0]
+        last = lines.pop()
+        self.pending = [last] if last else []
+        return self._number(lines)
+
+    def close(self):
+        rest = "".join(self.pending)
+        self.pending = []
+        return self._number([rest]) if rest else []
+
+    def _number(self, lines):
+        result = []
+        for line in lines:
+            self.lineno += 1
+            if line.strip():
+                result.append((self.lineno, line))
+        return result
+
+
+_whitespace_re = re.compile(r"[ \t\n\r]*")
+_error_pos_re = re.compile(r"\(char (\d+)")
+
+# a truncated escape like \ud834\udd1e fails up to this far before the end
+_ESCAPE_MARGIN = 12
+
+
+def _may_be_truncated(exc, buf):
+    u'''
+    raw_decode()의 에러가 buf가 값의 중간에서 끊겨서 난 것일 수 있는지.
+    The decoder stops where a valid prefix runs out of input, except for
+    unterminated strings, which it reports at their start.
+    '''
+    msg = str(exc)
+    if msg.startswith("Unterminated string"):
+        return True
+    mat = _error_pos_re.search(msg)
+    if mat is None:
+        return True
+    return int(mat.group(1)) + _ESCAPE_MARGIN >= len(buf)
+
+
+class IncrementalJSONReader(object):
+    u'''
+    file object에서 chunk 단위로 읽으며 JSON 값을 하나씩 decode한다.
+    Only the value being decoded (plus one chunk) is kept in memory.
+    Malformed input raises ValueError, like json.loads.
+    '''
+    def __init__(self, stream, chunk_size=65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        data = self.stream.read(size)
+        if not data:
+            self.eof = True
+            return
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def peek(self):
+        u'공백을 건너뛰고 다음 문자를 리턴한다. 입력이 끝났으면 ""를 리턴한다.'
+        while True:
+            self.pos = _whitespace_re.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill(self.chunk_size)
+
+    def expect(self, chars):
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError("Expected %s at offset %d of the buffer, got %s"
+                             % (" or ".join(map(repr, chars)), self.pos,
+                                repr(ch or "end of input")))
+        self.pos += 1
+        return ch
+
+    def decode_value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError as exc:
+                if self.eof or not _may_be_truncated(exc, self.buf):
+                    raise
+            else:
+                # a number at the end of the buffer may continue in the next chunk
+                if (end < len(self.buf) or self.eof
+                        or not isinstance(value, (int, long, float))):
+                    self.pos = end
+                    return value
+            self._fill(size)
+            size *= 2
+
+    def seek_key_path(self, path):
+        u'path의 key들을 따라 object 안으로 들어가, 해당 값의 바로 앞에 멈춘다.'
+        for key in path:
+            self.expect("{")
+            if self.peek() == "}":
+                raise KeyError(key)
+            while True:
+                found = self.decode_value()
+                self.expect(":")
+                if found == key:
+                    break
+                self.decode_value()
+                if self.expect(",}") == "}":
+                    raise KeyError(key)
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_json_array(fileobj_or_path, path=(), chunk_size=65536,
+                    compression="infer"):
+    u'''
+    최상위 JSON array, 또는 path의 key들을 따라간 위치의 array의 원소들을
+    하나씩 decode해 yield한다. A missing key raises KeyError.
+    '''
+    stream, should_close = open_stream(fileobj_or_path, "rb", compression)
+    try:
+        reader = IncrementalJSONReader(stream, chunk_size)
+        reader.seek_key_path(path)
+        for value in reader.iter_array():
+            yield value
+    finally:
+        if should_close:
+            stream.close()
+
+
+# sidecar index: a JSON header line, the offsets as little-endian uint64,
+# then a JSON list of [key, record number] pairs when the index is keyed
+_INDEX_VERSION = 1
+
+
+def default_index_path(path):
+    return path + ".idx"
+
+
+def _dump_offsets(offsets):
+    if getattr(offsets, "itemsize", None) != 8:
+        return struct.pack("<%dQ" % len(offsets), *offsets)
+    if sys.byteorder != "little":
+        offsets = array("L", offsets)
+        offsets.byteswap()
+    return offsets.tostring()
+
+
+def _load_offsets(data):
+    offsets = array("L")
+    if offsets.itemsize != 8:
+        offsets.extend(struct.unpack("<%dQ" % (len(data) // 8), data))
+        return offsets
+    offsets.fromstring(data)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets
+
+
+def build_jsonl_index(path, key=None, index_path=None):
+    u'''
+    JSON lines 파일의 (빈 줄이 아닌) 줄들의 byte offset을 sidecar 파일에 쓴다.
+    With key, each line is parsed and its value under key is mapped to the
+    record number; the first record wins for duplicate keys, and records
+    without the key are left out of the mapping. A malformed line raises
+    ValueError with its line number in the lineno attribute. Compressed
+    files can't be indexed since they can't be mmap()ed. Returns the number
+    of records.
+    '''
+    if index_path is None:
+        index_path = default_index_path(path)
+    offsets = array("L") if array("L").itemsize == 8 else []
+    keys = {} if key is not None else None
+    with open(path, "rb") as stream:
+        offset = 0
+        for lineno, line in enumerate(stream, 1):
+            if line.strip():
+                if keys is not None:
+                    try:
+                        record = json.loads(line)
+                    except ValueError as exc:
+                        err = ValueError("Invalid JSON: %s" % exc)
+                        err.lineno = lineno
+                        raise err
+                    if isinstance(record, dict) and key in record:
+                        try:
+                            keys.setdefault(record[key], len(offsets))
+                        except TypeError: # unhashable, can't be looked up
+                            pass
+                offsets.append(offset)
+            offset += len(line)
+
+    header = {
+        "version": _INDEX_VERSION,
+        "count": len(offsets),
+        "size": offset,
+        "key": key,
+    }
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(json.dumps(header) + "\n")
+        out.write(_dump_offsets(offsets))
+        if keys is not None:
+            out.write(json.dumps(sorted(keys.items(), key=lambda item: item[1])))
+    os.rename(tmp_path, index_path)
+    return len(offsets)
+
+
+class IndexedJSONLines(object):
+    u'''
+    build_jsonl_index()로 만든 index로 mmap된 JSON lines 파일의 줄을 바로 읽는다.
+    A ValueError is raised when the index doesn't match the data file.
+    '''
+    def __init__(self, path, index_path=None):
+        if index_path is None:
+            index_path = default_index_path(path)
+        with open(index_path, "rb") as stream:
+            header = json.loads(stream.readline())
+            if header.get("version") != _INDEX_VERSION:
+                raise ValueError("Unsupported index version: %s"
+                                 % repr(header.get("version")))
+            self.offsets = _load_offsets(stream.read(8 * header["count"]))
+            if len(self.offsets) != header["count"]:
+                raise ValueError("Truncated index: %s" % index_path)
+            self.key = header["key"]
+            self.keys = None
+            if self.key is not None:
+                self.keys = dict((record_key, recno) for record_key, recno
+                                 in json.loads(stream.read()))
+
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size != header["size"]:
+            self.file.close()
+            raise ValueError("Stale index: %s was built for %d bytes, the file "
+                             "has %d" % (index_path, header["size"], size))
+        self.mmap = None
+        if size:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def line(self, recno):
+        u'recno번째 record의 줄을 (줄바꿈 없이) 리턴한다. 음수는 뒤에서부터 센다.'
+        start = self.offsets[recno]
+        end = self.mmap.find("\n", start)
+        if end < 0:
+            end = len(self.mmap)
+        return self.mmap[start:end]
+
+    def recno_of(self, record_key):
+        if self.keys is None:
+            raise ValueError("The index has no key")
+        return self.keys[record_key]
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
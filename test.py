@@ -2,13 +2,48 @@
 
 import unittest
 
+import os
 import sys
+import json
+import pickle
+import gzip
+import inspect
+import shutil
+import tempfile
 
 from pprint import pprint
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from serialize import (Attr, AttrObject, AbstractAttrObject, IntegerAttr,
                        FloatAttr, MappingFailedError, UnicodeAttr,
                        ChoiceAttr, StringChoiceAttr, BytesAttr, OptionalAttr,
-                       ConstantAttr, NoneableAttr, DatetimeAttr, _all_subclasses)
+                       ConstantAttr, NoneableAttr, DatetimeAttr, _all_subclasses,
+                       AnyAttr, SignatureDictAttr, AttrObjectAdapter,
+                       AttrDecorator, ListAttr, SlottedAttrObject, AttrWrapper,
+                       PassThrough, SkipAll, PASS_THROUGH, Skip, SKIP_NONE,
+                       LoadFailedError, set_json_encoder, TrackedAttrObject,
+                       DumpFailedError, FrozenAttrObject)
+from interning import InternTable
+
+class ParallelRow(AttrObject):
+    # defined at module level so that pool workers can unpickle it
+    attributes = {
+        "id": int,
+        "name": OptionalAttr(unicode, default=u""),
+    }
+
+
+class SlottedParallelRow(SlottedAttrObject):
+    attributes = {
+        "id": int,
+        "tags": OptionalAttr([unicode], default=list),
+    }
+
 
 class TestAllSubclasses(unittest.TestCase):
     def runTest(self):
@@ -565,5 +600,1661 @@ class TestJSONDatetime(unittest.TestCase):
         self.assertEqual(clock.to_json_dict()["date"], "2016-01-01")
 
 
+class TestCompiledLoader(unittest.TestCase):
+    class Employee(AttrObject):
+        attributes = {
+            "name": unicode,
+            "age": OptionalAttr(int, default=0),
+            "tags": OptionalAttr([unicode], default=list),
+            "gender": ChoiceAttr(["male", "female"]),
+            "score": float,
+        }
+
+    class Company(AttrObject):
+        attributes = {
+            "employees": [lambda: TestCompiledLoader.Employee],
+            "CEO": lambda: TestCompiledLoader.Employee,
+            "extra": OptionalAttr({"founded": int}, default=None)
+        }
+
+    def _company_dict(self):
+        return {
+            "CEO": {"name": "Ritchie", "gender": "male", "score": 1},
+            "employees": [
+                {"name": u"Dave", "gender": "male", "score": 2.5,
+                 "tags": ["a", u"b"]},
+                {"name": u"Taylor", "gender": "female", "score": 3,
+                 "age": 31},
+            ],
+            "extra": {"founded": 1999},
+        }
+
+    def test_loader_is_cached(self):
+        loader = self.Employee._get_compiled_loader("object")
+        self.assertIs(loader, self.Employee._get_compiled_loader("object"))
+        self.assertIsNot(loader, self.Employee._get_compiled_loader("json"))
+
+    def test_same_as_generic(self):
+        generic = SignatureDictAttr(signature=self.Company.type_signature(),
+                                    __bootstrap__=True)
+        expected = generic.loads(self._company_dict(), "object")
+        loaded = self.Company._get_compiled_loader("object")(self._company_dict())
+        self.assertEqual(loaded, expected)
+
+        company = self.Company.loads_dict(self._company_dict())
+        self.assertEqual(company.employees[0].tags, [u"a", u"b"])
+        self.assertEqual(type(company.employees[0].tags[0]), unicode)
+        self.assertEqual(company.employees[1].age, 31)
+        self.assertEqual(company.employees[1].tags, [])
+        self.assertEqual(type(company.CEO.score), float)
+
+    def test_scope_name(self):
+        d = self._company_dict()
+        d["employees"][1]["tags"] = [u"ok", 3]
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Company.loads_dict(d)
+        self.assertEqual(cm.exception.scope_name, u"employees[1].tags[1]")
+
+        d = self._company_dict()
+        d["employees"][0]["gender"] = u"unknown"
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Company.loads_dict(d)
+        self.assertEqual(cm.exception.scope_name, u"employees[0].gender")
+
+        d = self._company_dict()
+        del d["CEO"]["name"]
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Company.loads_dict(d)
+        self.assertEqual(cm.exception.scope_name, u"CEO.name")
+
+    def test_builder(self):
+        builder = self.Employee._get_compiled_builder("object")
+        self.assertTrue(hasattr(builder, "source")) # not the raw fallback
+        self.assertIs(builder, self.Employee._get_compiled_builder("object"))
+        company = self.Company.loads_dict(self._company_dict())
+        self.assertEqual(company.employees[0],
+                         self.Employee(name=u"Dave", gender="male", score=2.5,
+                                       tags=[u"a", u"b"]))
+
+        log = []
+        class Node(AttrObject):
+            attributes = {"value": int}
+            def __postinit__(self):
+                log.append(self.value)
+
+        class FrozenNode(FrozenAttrObject):
+            attributes = {"value": int}
+
+        class Custom(AttrObject):
+            attributes = {"value": int}
+            def __init__(self, *args, **kwds):
+                AttrObject.__init__(self, *args, **kwds)
+                log.append("custom")
+
+        class Tree(AttrObject):
+            attributes = {"node": Node, "frozen": FrozenNode,
+                          "custom": Custom}
+
+        tree = Tree.loads_dict({"node": {"value": 1}, "frozen": {"value": 2},
+                                "custom": {"value": 3}})
+        self.assertItemsEqual(log, [1, "custom"])
+        self.assertEqual(tree.custom.value, 3)
+        with self.assertRaises(AttributeError):
+            tree.frozen.value = 3
+
+
+class TestCompiledDumper(unittest.TestCase):
+    class Shape(AbstractAttrObject):
+        attributes = {
+            "name": unicode,
+            "created": OptionalAttr(DatetimeAttr(format="%Y-%m-%d")),
+        }
+
+    class Polygon(Shape):
+        attributes = {
+            "points": [[int]],
+            "weights": OptionalAttr([float], default=list),
+        }
+
+    def test_same_as_generic(self):
+        polygon = self.Polygon(name="tri", created="2016-01-01",
+                               points=[[0, 0], [1, 0], [0, 1]],
+                               weights=[1, 0.5])
+        for env_type in ["object", "json"]:
+            generic = SignatureDictAttr(signature=self.Polygon.type_signature(),
+                                        __bootstrap__=True)
+            expected = generic.dumps(polygon.shallow_dict(), env_type)
+            polygon.inject_extra(expected)
+
+            dumper = self.Polygon._get_compiled_dumper(env_type)
+            self.assertIs(dumper, self.Polygon._get_compiled_dumper(env_type))
+            self.assertEqual(dumper(polygon), expected)
+            self.assertEqual(polygon.dumps_dict(env_type), expected)
+
+        self.assertEqual(polygon.dumps_json_dict()["_type"], "Polygon")
+        self.assertEqual(polygon.dumps_json_dict()["created"], "2016-01-01")
+        self.assertEqual(self.Shape.loads_dict(polygon.dumps_dict()), polygon)
+
+    def test_none_for_optional(self):
+        polygon = self.Polygon(name="empty", points=[])
+        self.assertIsNone(polygon.dumps_json_dict()["created"])
+
+    def test_scope_name(self):
+        polygon = self.Polygon(name="tri", points=[[0, 0]])
+        polygon.points[0][1] = "zero"
+        with self.assertRaises(MappingFailedError) as cm:
+            polygon.dumps_dict()
+        self.assertEqual(cm.exception.scope_name, u"points[0][1]")
+
+
+class TestCachedAdapter(unittest.TestCase):
+    def runTest(self):
+        class Parent(AttrObject):
+            attributes = {
+                "a": int
+            }
+
+        adapter = Parent.get_attr_adapter()
+        self.assertIs(adapter, Parent.get_attr_adapter())
+        self.assertIs(Attr.coerce(Parent), adapter)
+
+        sig_attr = adapter.get_signature_dict_attr(Parent)
+        self.assertIs(sig_attr, adapter.get_signature_dict_attr(Parent))
+
+        class Child(Parent):
+            attributes = {
+                "b": int
+            }
+
+        child_adapter = Child.get_attr_adapter()
+        self.assertIsNot(child_adapter, adapter)
+        self.assertIs(child_adapter.attrobj_cls, Child)
+        self.assertEqual(
+            sorted(adapter.get_signature_dict_attr(Child).signature.keys()),
+            ["a", "b"]
+        )
+        self.assertEqual(sorted(sig_attr.signature.keys()), ["a"])
+        self.assertEqual(Child(a=1, b=2).dumps_dict(), {"a": 1, "b": 2})
+
+
+class TestWrappedAttrCache(unittest.TestCase):
+    def test_cached_per_env_type(self):
+        attr = IntegerAttr()
+        impl = attr.do_get_wrapped_attr("object")
+        self.assertIs(impl, attr.do_get_wrapped_attr("object"))
+        self.assertIsNot(impl, attr.do_get_wrapped_attr("json"))
+        self.assertIsNot(impl, IntegerAttr().do_get_wrapped_attr("object"))
+
+        # ListAttr with several attrs goes through the generic loads
+        mixed = ListAttr(int, unicode)
+        self.assertEqual(mixed.loads([1, u"a", 2, u"b"], "object"),
+                         [1, u"a", 2, u"b"])
+        self.assertIs(mixed.attrs[0].do_get_wrapped_attr("object"),
+                      mixed.attrs[0].do_get_wrapped_attr("object"))
+
+    def test_dynamic_wrapped_attr(self):
+        calls = []
+
+        class CountingAttr(AttrDecorator):
+            cache_wrapped_attr = False
+
+            def get_wrapped_attr(self, env_type):
+                calls.append(env_type)
+                return int if env_type == "object" else float
+
+        attr = CountingAttr()
+        self.assertEqual(attr.loads(1, "object"), 1)
+        self.assertEqual(attr.loads(1.5, "json"), 1.5)
+        attr.loads(2, "object")
+        self.assertEqual(calls, ["object", "json", "object"])
+
+
+class TestSlotted(unittest.TestCase):
+    class Base(SlottedAttrObject):
+        attributes = {
+            "name": unicode,
+            "size": OptionalAttr(int, default=0),
+        }
+
+    class Derived(Base):
+        attributes = {
+            "size": OptionalAttr(int, default=1), # overriding
+            "*tags": [unicode],
+        }
+
+    class Tagged(AbstractAttrObject, SlottedAttrObject):
+        __slots__ = ("cache", )
+        attributes = {
+            "value": int
+        }
+
+    def test_no_dict(self):
+        x = self.Derived(u"a", u"b", name=u"x")
+        self.assertFalse(hasattr(x, "__dict__"))
+        self.assertEqual(self.Base.__slots__, ("name", "size"))
+        self.assertEqual(self.Derived.__slots__, ("tags", ))
+        self.assertEqual(dict(x.items()),
+                         {"name": u"x", "size": 1, "tags": [u"a", u"b"]})
+        with self.assertRaises(AttributeError):
+            x.unknown = 1
+
+    def test_roundtrip(self):
+        x = self.Derived(u"a", name=u"x", size=3)
+        y = self.Derived.loads_dict(x.dumps_dict())
+        self.assertEqual(x, y)
+        self.assertEqual(y.size, 3)
+        self.assertEqual(self.Base(name=u"y").size, 0)
+        self.assertNotEqual(self.Base(name=u"y"), self.Base(name=u"z"))
+
+    def test_abstract(self):
+        x = self.Tagged(value=3)
+        x.cache = "extra slot"
+        self.assertFalse(hasattr(x, "__dict__"))
+        self.assertEqual(self.Tagged.loads_dict(x.dumps_dict()), x)
+
+
+class TestCompiledConstructor(unittest.TestCase):
+    class Call(AttrObject):
+        attributes = {
+            "func#0": unicode,
+            "arg#1": int,
+            "flag": OptionalAttr(bool, default=False),
+            "*rest": [int],
+            "**options": dict,
+        }
+
+    class Point(AttrObject):
+        attributes = {
+            "x#0": int,
+            "y#1": int,
+        }
+
+    def test_signature(self):
+        spec = inspect.getargspec(self.Call.__init__)
+        self.assertEqual(spec.args, ["self", "func", "arg"])
+        self.assertEqual(spec.varargs, "rest")
+
+        spec = inspect.getargspec(self.Point.__init__)
+        self.assertEqual(spec.args, ["self", "x", "y"])
+        self.assertEqual(spec.varargs, "_args") # for apply_arguments() errors
+
+    def test_arguments(self):
+        call = self.Call(u"f", 1, 2, 3, flag=True, verbose=1)
+        self.assertEqual((call.func, call.arg, call.rest, call.flag),
+                         (u"f", 1, [2, 3], True))
+        self.assertEqual(call.options, {"verbose": 1})
+
+        call = self.Call(arg=2, func=u"g")
+        self.assertEqual((call.func, call.arg, call.rest, call.flag),
+                         (u"g", 2, [], False))
+        self.assertEqual(call.options, {})
 
+        self.assertEqual(self.Point(1, y=2), self.Point(x=1, y=2))
+        with self.assertRaises(TypeError):
+            self.Point(1)
+        with self.assertRaises(TypeError) as cm:
+            self.Point(1, 2, 3)
+        self.assertEqual(str(cm.exception), "Unexpected 3rd positional argument")
+        with self.assertRaises(TypeError):
+            self.Point(1, 2, z=3)
+        with self.assertRaises(MappingFailedError):
+            self.Point(1, "2")
+
+    def test_raw_construction(self):
+        point = self.Point(__raw__=True, x="not checked", y=2)
+        self.assertEqual(point.x, "not checked")
+
+    def test_postinit_and_inheritance(self):
+        seq = []
+
+        class Base(AttrObject):
+            attributes = {
+                "a#0": int
+            }
 
+            def __postinit__(self):
+                seq.append(("base", self.a))
+
+        class Child(Base):
+            attributes = {
+                "b#1": int
+            }
+
+            def __postinit__(self):
+                seq.append(("child", self.b))
+
+        Child(1, 2)
+        self.assertEqual(seq, [("base", 1), ("child", 2)])
+        self.assertEqual(inspect.getargspec(Child.__init__).args,
+                         ["self", "a", "b"])
+
+    def test_user_defined_init(self):
+        class Custom(AttrObject):
+            attributes = {
+                "a": int
+            }
+
+            def __init__(self, a):
+                AttrObject.__init__(self, a=a * 2)
+
+        class CustomChild(Custom):
+            pass
+
+        self.assertEqual(Custom(1).a, 2)
+        self.assertEqual(CustomChild(2).a, 4)
+
+    def test_subclass_init_calls_compiled(self):
+        class Base(AttrObject):
+            attributes = {
+                "x#0": int
+            }
+
+        class Child(Base):
+            attributes = {
+                "y": int
+            }
+
+            def __init__(self, *args, **kwds):
+                super(Child, self).__init__(*args, **kwds)
+
+            def __postinit__(self):
+                self.total = self.x + self.y
+
+        self.assertEqual(Child(x=1, y=2).total, 3)
+        self.assertEqual(Child(5, y=2).total, 7)
+        self.assertEqual(Child.loads_dict({"x": 1, "y": 3}).total, 4)
+        with self.assertRaises(TypeError):
+            Child(1, y=2, z=3)
+        self.assertEqual(Base(3).x, 3)
+
+
+class TestDecoratorProtocol(unittest.TestCase):
+    class LegacyAttr(AttrWrapper):
+        def pre_loads(self, val):
+            if val == "skip":
+                raise SkipAll("skipped")
+
+        def wrap_loads(self, val, env_type):
+            if val == 0:
+                raise PassThrough
+            return val * 2
+
+        def wrap_dumps(self, obj, env_type):
+            if obj is None:
+                raise SkipAll(-1)
+            raise PassThrough
+
+    class SentinelAttr(AttrWrapper):
+        def pre_loads(self, val):
+            if val == "skip":
+                return Skip("skipped")
+
+        def wrap_loads(self, val, env_type):
+            if val == 0:
+                return PASS_THROUGH
+            return val * 2
+
+        def wrap_dumps(self, obj, env_type):
+            if obj is None:
+                return Skip(-1)
+            return PASS_THROUGH
+
+    def test_same_behavior(self):
+        for cls in [self.LegacyAttr, self.SentinelAttr]:
+            attr = cls(AnyAttr())
+            self.assertEqual(attr.loads("skip", "object"), "skipped")
+            self.assertEqual(attr.loads(0, "object"), 0)
+            self.assertEqual(attr.loads(2, "object"), 4)
+            self.assertEqual(attr.dumps(None, "object"), -1)
+            self.assertEqual(attr.dumps(3, "object"), 3)
+
+    def test_builtin_attrs(self):
+        self.assertIs(IntegerAttr().wrap_loads(1, "object"), PASS_THROUGH)
+        self.assertIs(ChoiceAttr([1, 2]).wrap_loads(1, "object"), PASS_THROUGH)
+        self.assertIs(OptionalAttr(int).wrap_dumps(None, "object"), SKIP_NONE)
+        self.assertIsNone(NoneableAttr(int).loads(None, "object"))
+        self.assertIsNone(NoneableAttr(int).dumps(None, "object"))
+        self.assertEqual(NoneableAttr(int).dumps(3, "object"), 3)
+
+
+class TestValidate(unittest.TestCase):
+    class Item(AbstractAttrObject):
+        attributes = {
+            "name": unicode,
+            "count": OptionalAttr(int, default=0),
+        }
+
+    class Bundle(Item):
+        attributes = {
+            "items": [lambda: TestValidate.Item],
+            "meta": {"level": StringChoiceAttr(["low", "high"])},
+        }
+
+    def _bundle_dict(self):
+        return {
+            "_type": "Bundle",
+            "name": u"bundle",
+            "items": [{"_type": "Item", "name": u"a"},
+                      {"_type": "Item", "name": u"b", "count": 2}],
+            "meta": {"level": "low"},
+        }
+
+    def test_valid(self):
+        d = self._bundle_dict()
+        self.Item.validate_dict(d)
+        self.assertEqual(d, self._bundle_dict()) # untouched
+        self.assertEqual(self.Item.validation_errors(d), [])
+        self.Bundle.validate_json('{"_type": "Bundle", "name": "x", "items": [], "meta": {"level": "high"}}')
+
+        postinits = []
+
+        class Hooked(AttrObject):
+            attributes = {
+                "a": int
+            }
+
+            def __postinit__(self):
+                postinits.append(self)
+
+        Hooked.validate_dict({"a": 1})
+
+        class DateAttr(AttrDecorator):
+            def get_wrapped_attr(self, env_type):
+                return DatetimeAttr()
+
+            def wrap_loads(self, val, env_type):
+                return val.date()
+
+        class Event(AttrObject):
+            attributes = {
+                "day": DateAttr()
+            }
+
+        Event.validate_json('{"day": "2020-01-02 03:04:05"}')
+        self.assertEqual(Event.loads_json('{"day": "2020-01-02 03:04:05"}').day,
+                         datetime(2020, 1, 2).date())
+        with self.assertRaises(MappingFailedError):
+            Event.validate_json('{"day": "not a date"}')
+        self.assertEqual(postinits, [])
+
+    def test_first_error(self):
+        d = self._bundle_dict()
+        d["items"][1]["count"] = "two"
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Item.validate_dict(d)
+        self.assertEqual(cm.exception.scope_name, u"items[1].count")
+
+        with self.assertRaises(MappingFailedError):
+            self.Item.validate_dict({"_type": "Unknown"})
+        with self.assertRaises(MappingFailedError):
+            self.Item.validate_dict([])
+
+    def test_all_errors(self):
+        d = self._bundle_dict()
+        d["items"][0]["name"] = 1
+        d["items"][1]["count"] = "two"
+        del d["items"][1]["name"]
+        d["meta"]["level"] = "medium"
+        errors = self.Item.validation_errors(d)
+        self.assertEqual(sorted(exc.scope_name for exc in errors),
+                         [u"items[0].name", u"items[1].count",
+                          u"items[1].name", u"meta.level"])
+        for exc in errors:
+            self.assertIsInstance(exc, MappingFailedError)
+
+        self.assertEqual(len(self.Item.validation_errors("not a dict")), 1)
+
+
+class TestCoerceRuleDispatch(unittest.TestCase):
+    def tearDown(self):
+        for base_type in [self.Base, self.Derived]:
+            Attr._coerce_chain.pop(base_type, None)
+        Attr._coerce_chain_cache.clear()
+
+    class Base(object):
+        pass
+
+    class Derived(Base):
+        pass
+
+    class MoreDerived(Derived):
+        pass
+
+    def test_mro_order_and_invalidation(self):
+        @Attr.coerce_rule(self.Base)
+        def base_rule(obj):
+            return AnyAttr()
+
+        self.assertIsInstance(Attr.coerce(self.MoreDerived()), AnyAttr)
+        self.assertEqual(Attr._coerce_chain_cache[self.MoreDerived],
+                         (base_rule, ))
+
+        @Attr.coerce_rule(self.Derived)
+        def derived_rule(obj):
+            return IntegerAttr()
+
+        self.assertNotIn(self.MoreDerived, Attr._coerce_chain_cache)
+        self.assertIsInstance(Attr.coerce(self.MoreDerived()), IntegerAttr)
+        self.assertIsInstance(Attr.coerce(self.Base()), AnyAttr)
+        self.assertEqual(Attr._coerce_chain_cache[self.MoreDerived],
+                         (derived_rule, base_rule))
+
+    def test_class_reference(self):
+        class Referenced(AttrObject):
+            pass
+
+        adapter = Attr.coerce(Referenced)
+        self.assertIsInstance(adapter, AttrObjectAdapter)
+        self.assertIs(adapter.attrobj_cls, Referenced)
+        with self.assertRaises(TypeError):
+            Attr.coerce(self.Base)
+
+
+class TestTypeRegistry(unittest.TestCase):
+    def runTest(self):
+        class Event(AbstractAttrObject):
+            attributes = {
+                "at": int
+            }
+
+        class Click(Event):
+            attributes = {
+                "x": int
+            }
+
+        class DoubleClick(Click):
+            type_value = "dblclick"
+
+        self.assertIs(Event.guess_class({"_type": "dblclick"}), DoubleClick)
+        self.assertIs(Click.guess_class({"_type": "Click"}), Click)
+        self.assertEqual(Event._type_registry,
+                         {"Event": Event, "Click": Click,
+                          "dblclick": DoubleClick})
+        self.assertEqual(Click._type_registry,
+                         {"Click": Click, "dblclick": DoubleClick})
+
+        # not a subclass of Click
+        with self.assertRaises(MappingFailedError):
+            Click.loads_dict({"_type": "Event", "at": 1})
+        with self.assertRaises(MappingFailedError):
+            Event.loads_dict({"_type": ["unhashable"], "at": 1})
+
+        # defined later, e.g. by a plugin
+        class Scroll(Event):
+            attributes = {
+                "delta": int
+            }
+
+        scroll = Event.loads_dict({"_type": "Scroll", "at": 1, "delta": -3})
+        self.assertIsInstance(scroll, Scroll)
+        self.assertEqual(scroll.dumps_dict(),
+                         {"_type": "Scroll", "at": 1, "delta": -3})
+
+        with self.assertRaises(TypeError):
+            class AnotherDoubleClick(Event):
+                type_value = "dblclick"
+
+
+class TestJSONLines(unittest.TestCase):
+    class Row(AttrObject):
+        attributes = {
+            "id": int,
+            "tags": OptionalAttr([unicode], default=list),
+        }
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _rows(self, n):
+        return [self.Row(id=i, tags=[u"t%d" % i]) for i in range(n)]
+
+    def test_roundtrip(self):
+        from StringIO import StringIO
+        fp = StringIO()
+        self.assertEqual(self.Row.dump_jsonl(self._rows(3), fp), 3)
+        self.assertEqual(len(fp.getvalue().splitlines()), 3)
+
+        fp = StringIO(fp.getvalue() + "\n  \n")
+        self.assertEqual(list(self.Row.iter_loads_jsonl(fp)), self._rows(3))
+
+    def test_gzip(self):
+        path = os.path.join(self.tmpdir, "rows.jsonl.gz")
+        self.Row.dump_jsonl(iter(self._rows(5)), path)
+        with gzip.open(path, "rb") as fp:
+            self.assertEqual(len(fp.read().splitlines()), 5)
+        self.assertEqual(list(self.Row.iter_loads_jsonl(path)), self._rows(5))
+
+        with open(path, "rb") as fp:
+            self.assertEqual(list(self.Row.iter_loads_jsonl(fp)), self._rows(5))
+            self.assertFalse(fp.closed)
+        with gzip.open(path, "rb") as fp:
+            self.assertEqual(list(self.Row.iter_loads_jsonl(fp)), self._rows(5))
+
+    def test_error_lineno(self):
+        from StringIO import StringIO
+        fp = StringIO('{"id": 1}\n\n{"id": 2, "tags": ["a", 3]}\n')
+        loaded = self.Row.iter_loads_jsonl(fp)
+        self.assertEqual(next(loaded).id, 1)
+        with self.assertRaises(MappingFailedError) as cm:
+            next(loaded)
+        self.assertEqual(cm.exception.lineno, 3)
+        self.assertEqual(cm.exception.scope_name, u"tags[1]")
+        self.assertTrue(str(cm.exception).startswith("line 3: "))
+
+        with self.assertRaises(MappingFailedError) as cm:
+            list(self.Row.iter_loads_jsonl(StringIO('{"id": 1}\n{"id": \n')))
+        self.assertEqual(cm.exception.lineno, 2)
+
+
+class TestJSONArray(unittest.TestCase):
+    class Row(AttrObject):
+        attributes = {
+            "id": int,
+            "score": float,
+            "name": unicode,
+        }
+
+    def _load(self, text, **kwds):
+        from StringIO import StringIO
+        return list(self.Row.iter_loads_json_array(StringIO(text), **kwds))
+
+    def test_small_chunks(self):
+        rows = [self.Row(id=i, score=i * 1.5, name=u"가" * i)
+                for i in range(20)]
+        text = json.dumps([row.dumps_json_dict() for row in rows],
+                          ensure_ascii=False).encode("utf-8")
+        for chunk_size in (1, 3, 7, 1024):
+            self.assertEqual(self._load(text, chunk_size=chunk_size), rows)
+
+    def test_number_split_across_chunks(self):
+        text = ' [ {"name": "a", "score": 1.25, "id": 123456789} ] '
+        for chunk_size in range(1, 10):
+            rows = self._load(text, chunk_size=chunk_size)
+            self.assertEqual(rows[0].id, 123456789)
+
+    def test_empty(self):
+        self.assertEqual(self._load("[]"), [])
+        self.assertEqual(self._load(' { "items" : [ ] } ', path=("items",)), [])
+
+    def test_key_path(self):
+        text = ('{"meta": {"items": [1, 2]}, "data": {"count": 1, '
+                '"items": [{"id": 1, "score": 0.5, "name": "x"}]}}')
+        rows = self._load(text, path=("data", "items"), chunk_size=4)
+        self.assertEqual(rows, [self.Row(id=1, score=0.5, name=u"x")])
+
+        with self.assertRaises(LoadFailedError):
+            self._load(text, path=("data", "missing"))
+
+    def test_errors(self):
+        text = ('{"data": [{"id": 1, "score": 0.5, "name": "x"}, '
+                '{"id": "2", "score": 0.5, "name": "y"}]}')
+        with self.assertRaises(MappingFailedError) as cm:
+            self._load(text, path=("data",))
+        self.assertEqual(cm.exception.scope_name, u"data[1].id")
+
+        with self.assertRaises(LoadFailedError):
+            self._load('[{"id": 1, "score": 0.5, "name": "x"}, {"id"')
+        with self.assertRaises(LoadFailedError):
+            self._load('{"id": 1}')
+
+    def test_malformed_element_fails_early(self):
+        from StringIO import StringIO
+        good = json.dumps({"id": 1, "score": 0.5, "name": u"x" * 100})
+        text = "[%s, {\"id\": 2, oops}, %s]" % (good, ", ".join([good] * 30000))
+        stream = StringIO(text)
+        with self.assertRaises(LoadFailedError) as cm:
+            list(self.Row.iter_loads_json_array(stream, chunk_size=1024))
+        self.assertEqual(cm.exception.scope_name, u"[1]")
+        self.assertLess(stream.tell(), 64 * 1024)
+
+        long_string = '[{"id": 1, "score": 0.5, "name": "%s"}]' % ("y" * 5000)
+        self.assertEqual(self._load(long_string, chunk_size=16)[0].name,
+                         u"y" * 5000)
+        escaped = '[{"id": 1, "score": 0.5, "name": "\\ud834\\udd1e"}]'
+        for chunk_size in range(1, 12):
+            self.assertEqual(self._load(escaped, chunk_size=chunk_size)[0].name,
+                             u"\U0001d11e")
+
+
+class TestBatch(unittest.TestCase):
+    class Item(AttrObject):
+        attributes = {
+            "id": int,
+            "name": OptionalAttr(unicode, default=u""),
+        }
+
+    class Animal(AbstractAttrObject):
+        type_key = "kind"
+        attributes = {"name": unicode}
+
+    class Dog(Animal):
+        type_value = "dog"
+
+    class Cat(Animal):
+        type_value = "cat"
+
+    def test_loads_many(self):
+        items = self.Item.loads_many([{"id": 1}, {"id": 2, "name": u"b"},
+                                      self.Item(id=3)])
+        self.assertEqual(items, [self.Item(id=1), self.Item(id=2, name=u"b"),
+                                 self.Item(id=3)])
+        self.assertEqual(self.Item.loads_many(iter([])), [])
+
+    def test_polymorphic(self):
+        animals = self.Animal.loads_many([{"kind": "dog", "name": u"a"},
+                                          {"kind": "cat", "name": u"b"}])
+        self.assertEqual([type(a) for a in animals], [self.Dog, self.Cat])
+        dumped = self.Animal.dumps_many(animals)
+        self.assertEqual(dumped, [{"kind": "dog", "name": u"a"},
+                                  {"kind": "cat", "name": u"b"}])
+
+    def test_error_policies(self):
+        rows = [{"id": 1}, {"id": "x"}, {"id": 3}, {"name": u"n"}]
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Item.loads_many(rows)
+        self.assertEqual(cm.exception.scope_name, u"[1].id")
+
+        self.assertEqual([item.id for item in
+                          self.Item.loads_many(rows, errors="skip")], [1, 3])
+
+        errors = []
+        self.assertEqual(len(self.Item.loads_many(rows, errors=errors)), 2)
+        self.assertEqual([idx for idx, _ in errors], [1, 3])
+        self.assertEqual(errors[0][1].scope_name, u"[1].id")
+
+        with self.assertRaises(ValueError):
+            self.Item.loads_many(rows, errors="ignore")
+
+    def test_dumps_many(self):
+        items = [self.Item(id=1), self.Item(id=2, name=u"b")]
+        self.assertEqual(self.Item.dumps_many(items, env_type="json"),
+                         [item.dumps_json_dict() for item in items])
+
+        errors = []
+        self.assertEqual(self.Item.dumps_many([items[0], 3], errors=errors),
+                         [items[0].dumps_dict()])
+        self.assertEqual(errors[0][0], 1)
+
+
+class TestParallel(unittest.TestCase):
+    def test_pickle(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            for obj in [ParallelRow(id=1, name=u"a"),
+                        ParallelRow.loads_dict({"id": 2}),
+                        SlottedParallelRow(id=3, tags=[u"x"])]:
+                copied = pickle.loads(pickle.dumps(obj, protocol))
+                self.assertEqual(copied, obj)
+                self.assertIs(type(copied), type(obj))
+
+    def test_order(self):
+        records = [{"id": i, "name": u"n%d" % i} for i in range(50)]
+        for workers in (1, 3):
+            rows = ParallelRow.loads_many_parallel(records, workers=workers,
+                                                   chunksize=7)
+            self.assertEqual(rows, ParallelRow.loads_many(records))
+
+    def test_raw_json_and_dump(self):
+        lines = [json.dumps({"id": i, "tags": ["t"]}) for i in range(10)]
+        dumped = SlottedParallelRow.loads_many_parallel(
+            lines, workers=2, chunksize=3, raw_json=True, dump="json")
+        self.assertEqual(dumped, [json.loads(line) for line in lines])
+
+    def test_errors(self):
+        records = [{"id": 1}, {"id": "x"}, {"id": 3}, {"id": 4, "name": 5}]
+        with self.assertRaises(MappingFailedError) as cm:
+            ParallelRow.loads_many_parallel(records, workers=2, chunksize=2)
+        self.assertEqual(cm.exception.scope_name, u"[1].id")
+
+        for workers in (1, 2):
+            errors = []
+            rows = ParallelRow.loads_many_parallel(
+                records, workers=workers, chunksize=2, errors=errors)
+            self.assertEqual([row.id for row in rows], [1, 3])
+            self.assertEqual([idx for idx, _ in errors], [1, 3])
+            self.assertEqual(errors[1][1].scope_name, u"[3].name")
+
+
+class TestPushLoading(unittest.TestCase):
+    def test_feeder(self):
+        text = "".join(json.dumps({"id": i, "name": u"가%d" % i},
+                                  ensure_ascii=False).encode("utf-8") + "\n"
+                       for i in range(5))
+        text = text.rstrip("\n")
+        for size in (1, 4, 100):
+            feeder = ParallelRow.jsonl_feeder()
+            rows = []
+            for idx in range(0, len(text), size):
+                rows.extend(feeder.feed(text[idx:idx + size]))
+            self.assertEqual(len(rows), 4)
+            rows.extend(feeder.close())
+            self.assertEqual(rows, [ParallelRow(id=i, name=u"가%d" % i)
+                                    for i in range(5)])
+
+    def test_feeder_error_lineno(self):
+        feeder = ParallelRow.jsonl_feeder()
+        self.assertEqual(len(feeder.feed('{"id": 1}\n\n{"id"')), 1)
+        with self.assertRaises(MappingFailedError) as cm:
+            feeder.feed(': "x"}\n')
+        self.assertEqual(cm.exception.lineno, 3)
+        self.assertEqual(cm.exception.scope_name, u"id")
+
+    def test_feeder_keeps_records_around_errors(self):
+        chunk = '{"id":1}\n{"id":"x"}\n{"id":3}\n{"id":4}\n'
+        feeder = ParallelRow.jsonl_feeder()
+        with self.assertRaises(MappingFailedError) as cm:
+            feeder.feed(chunk)
+        self.assertEqual(cm.exception.lineno, 2)
+        self.assertEqual([row.id for row in feeder.feed("")], [1, 3, 4])
+
+        errors = []
+        feeder = ParallelRow.jsonl_feeder(errors=errors)
+        rows = feeder.feed(chunk) + feeder.close()
+        self.assertEqual([row.id for row in rows], [1, 3, 4])
+        self.assertEqual(errors[0][0], 2)
+        self.assertEqual([row.id for row in ParallelRow.jsonl_feeder(
+            errors="skip").feed(chunk)], [1, 3, 4])
+        with self.assertRaises(ValueError):
+            ParallelRow.jsonl_feeder(errors="ignore")
+
+    def test_loads_many_async(self):
+        records = [{"id": i} for i in range(10)]
+        result = ParallelRow.loads_many_async(records)
+        self.assertEqual(result.get(5), ParallelRow.loads_many(records))
+
+        errors = []
+        result = ParallelRow.loads_many_async([{"id": "x"}], errors=errors)
+        self.assertEqual(result.get(5), [])
+        self.assertEqual(errors[0][0], 0)
+
+        with self.assertRaises(MappingFailedError):
+            ParallelRow.loads_many_async([{"id": "x"}]).get(5)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestColumns(unittest.TestCase):
+    class Sample(AttrObject):
+        attributes = {
+            "id": int,
+            "score": float,
+            "ok": bool,
+            "name": unicode,
+            "code": str,
+            "color": StringChoiceAttr([u"red", u"green"]),
+            "weight": NoneableAttr(float),
+            "tags": [unicode],
+        }
+
+    def _samples(self):
+        return [self.Sample(id=i, score=i / 2.0, ok=i % 2 == 0,
+                            name=u"가" * i, code="c%d" % i,
+                            color=[u"red", u"green"][i % 2],
+                            weight=None if i == 1 else float(i),
+                            tags=[u"t"] * min(i, 1))
+                for i in range(3)]
+
+    def test_dict_of_arrays(self):
+        cols = self.Sample.to_columns(self._samples())
+        self.assertEqual(cols["id"].dtype, numpy.dtype("i8"))
+        self.assertEqual(cols["score"].tolist(), [0.0, 0.5, 1.0])
+        self.assertEqual(cols["ok"].dtype, numpy.dtype("?"))
+        self.assertEqual(cols["name"].dtype, numpy.dtype("U2"))
+        self.assertEqual(cols["name"].tolist(), [u"", u"가", u"가가"])
+        self.assertEqual(cols["code"].dtype, numpy.dtype("S2"))
+        self.assertEqual(cols["color"].dtype, numpy.dtype("U5"))
+        self.assertTrue(numpy.isnan(cols["weight"][1]))
+        self.assertEqual(cols["tags"].dtype, numpy.dtype(object))
+        self.assertEqual(cols["tags"].shape, (3, ))
+        self.assertEqual(cols["tags"][2], [u"t"])
+
+    def test_structured(self):
+        arr = self.Sample.to_columns(self._samples(), structured=True)
+        self.assertEqual(arr.shape, (3, ))
+        self.assertEqual(sorted(arr.dtype.names),
+                         sorted(self.Sample.type_signature()))
+        self.assertEqual(arr["id"].tolist(), [0, 1, 2])
+
+        empty = self.Sample.to_columns([], structured=True)
+        self.assertEqual(empty.shape, (0, ))
+
+    def test_overflow(self):
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Sample.to_columns([self.Sample(
+                id=2 ** 70, score=0.0, ok=True, name=u"", code="",
+                color=u"red", weight=None, tags=[])])
+        self.assertEqual(cm.exception.scope_name, u"id")
+
+    def test_type_mismatch(self):
+        sample = self._samples()[0]
+        sample.id = 3.7
+        with self.assertRaises(DumpFailedError) as cm:
+            self.Sample.to_columns([sample])
+        self.assertEqual(cm.exception.scope_name, u"id")
+
+    def test_trailing_nul(self):
+        samples = self._samples()
+        samples[0].code = "a\x00"
+        samples[1].name = u"b\x00"
+        cols = self.Sample.to_columns(samples)
+        self.assertEqual(cols["code"].dtype, numpy.dtype(object))
+        self.assertEqual(self.Sample.from_columns(cols), samples)
+
+    def test_from_columns_roundtrip(self):
+        samples = self._samples()
+        for structured in (False, True):
+            cols = self.Sample.to_columns(samples, structured=structured)
+            self.assertEqual(self.Sample.from_columns(cols), samples)
+        lazy = self.Sample.from_columns(self.Sample.to_columns(samples),
+                                        lazy=True)
+        self.assertEqual(next(lazy), samples[0])
+
+    def test_from_columns_missing_optional(self):
+        class Row(AttrObject):
+            attributes = {
+                "i": OptionalAttr(int),
+                "f": OptionalAttr(float),
+                "n": NoneableAttr(int),
+            }
+        rows = [Row(i=1, f=0.5, n=None), Row(n=2)]
+        self.assertIsNone(rows[1].i)
+        for structured in (False, True):
+            cols = Row.to_columns(rows, structured=structured)
+            self.assertEqual(Row.from_columns(cols), rows)
+        with self.assertRaises(MappingFailedError) as cm:
+            Row.from_columns({"i": numpy.array([None, u"x"], dtype=object),
+                              "f": [1.0, 2.0], "n": [1, 2]})
+        self.assertEqual(cm.exception.scope_name, u"i[1]")
+
+    def test_from_columns_types(self):
+        class Row(AttrObject):
+            attributes = {
+                "id": int,
+                "score": float,
+                "color": ChoiceAttr([1, 2]),
+                "note": OptionalAttr(unicode, default=u"-"),
+            }
+        rows = Row.from_columns({
+            "id": numpy.arange(3, dtype="i4"),
+            "score": numpy.array([1, 2, 3]),
+            "color": numpy.array([1, 2, 1]),
+        })
+        self.assertEqual(rows[2], Row(id=2, score=3.0, color=1, note=u"-"))
+        self.assertIs(type(rows[2].id), int)
+        self.assertIs(type(rows[2].score), float)
+
+        with self.assertRaises(MappingFailedError) as cm:
+            Row.from_columns({"id": numpy.array([0.5]),
+                              "score": [1.0], "color": [1]})
+        self.assertEqual(cm.exception.scope_name, u"id")
+
+        with self.assertRaises(MappingFailedError) as cm:
+            Row.from_columns({"id": [1, 2, 3], "score": [1.0, 2.0, 3.0],
+                              "color": numpy.array([1, 2, 3])})
+        self.assertEqual(cm.exception.scope_name, u"color[2]")
+
+        with self.assertRaises(MappingFailedError) as cm:
+            Row.from_columns({"id": [1, 2], "score": [1.0]})
+        with self.assertRaises(MappingFailedError) as cm:
+            Row.from_columns({"id": [1], "score": [1.0]})
+        self.assertEqual(cm.exception.scope_name, u"color")
+
+    def test_from_columns_object_fallback(self):
+        tags = numpy.empty(2, dtype=object)
+        tags[0], tags[1] = [u"a"], [u"b", 3]
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Sample.from_columns({
+                "id": [1, 2], "score": [0.0, 0.0], "ok": [True, False],
+                "name": [u"a", u"b"], "code": ["a", "b"],
+                "color": [u"red", u"red"], "weight": [None, 1.0],
+                "tags": tags,
+            })
+        self.assertEqual(cm.exception.scope_name, u"tags[1][1]")
+
+
+class BinaryShape(AbstractAttrObject):
+    type_key = "kind"
+    attributes = {"name": unicode}
+
+
+class BinaryCircle(BinaryShape):
+    type_value = "circle"
+    attributes = {"radius": float}
+
+
+class BinaryPolygon(BinaryShape):
+    type_value = "polygon"
+    attributes = {
+        "points": [[int]],
+        "closed": bool,
+    }
+
+
+class Drawing(AttrObject):
+    attributes = {
+        "id": int,
+        "title": OptionalAttr(unicode, default=u"untitled"),
+        "note": NoneableAttr(unicode),
+        "raw": str,
+        "color": ChoiceAttr([u"red", 3, None]),
+        "shapes": [BinaryShape],
+        "created": DatetimeAttr(format=u"%Y-%m-%d"),
+        "extra": AnyAttr(),
+    }
+
+
+class TestBinary(unittest.TestCase):
+    Shape = BinaryShape
+    Circle = BinaryCircle
+    Polygon = BinaryPolygon
+    Drawing = Drawing
+
+    def _drawing(self, **kwds):
+        drawing = dict(
+            id=-(2 ** 70), title=u"가나", note=None, raw="\x00\xff",
+            color=3, created=datetime(2020, 1, 2), extra={"a": [1]},
+            shapes=[self.Circle(name=u"c", radius=1.5),
+                    self.Polygon(name=u"p", points=[[0, 0], [1, -1]],
+                                 closed=True)])
+        drawing.update(kwds)
+        if drawing["title"] is None:
+            del drawing["title"]
+        return self.Drawing(**drawing)
+
+    def test_roundtrip(self):
+        for drawing in [self._drawing(), self._drawing(title=None, shapes=[],
+                                                       note=u"n", id=0)]:
+            data = drawing.dumps_binary()
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(self.Drawing.loads_binary(data), drawing)
+
+        circle = self.Circle(name=u"c", radius=2.0)
+        self.assertEqual(self.Shape.loads_binary(circle.dumps_binary()), circle)
+        self.assertEqual(self.Circle.loads_binary(circle.dumps_binary()), circle)
+        with self.assertRaises(LoadFailedError):
+            self.Polygon.loads_binary(circle.dumps_binary())
+
+    def test_subclass_defined_later(self):
+        class Sh(AbstractAttrObject):
+            attributes = {"w": int}
+
+        class Ci(Sh):
+            attributes = {"q": int}
+
+        data = Ci(w=1, q=2).dumps_binary()
+
+        class Aa(Sh):
+            attributes = {"q": int}
+
+        self.assertIs(type(Sh.loads_binary(data)), Ci)
+        self.assertEqual(Sh.loads_binary(data), Ci(w=1, q=2))
+
+    def test_compact(self):
+        drawing = self._drawing(raw="ab")
+        self.assertLess(len(drawing.dumps_binary()),
+                        len(drawing.dumps_json()) / 2)
+
+    def test_errors(self):
+        data = self._drawing().dumps_binary()
+        with self.assertRaises(LoadFailedError):
+            self.Drawing.loads_binary(data[:-3])
+        with self.assertRaises(LoadFailedError):
+            self.Drawing.loads_binary(data + "\x00")
+
+        drawing = self._drawing()
+        drawing.shapes[1].points[0][1] = "x"
+        with self.assertRaises(MappingFailedError) as cm:
+            drawing.dumps_binary()
+        self.assertEqual(cm.exception.scope_name, u"shapes[1].points[0][1]")
+
+
+class TestCompactJSON(unittest.TestCase):
+    def test_array_layout(self):
+        class Point(AttrObject):
+            attributes = {
+                "y#1": int,
+                "x#0": int,
+                "label": OptionalAttr(unicode, default=u"-"),
+                "at": DatetimeAttr(format=u"%Y-%m-%d"),
+            }
+        point = Point(1, 2, at=datetime(2020, 1, 2))
+        self.assertEqual(point.dumps_dict(env_type="json_compact"),
+                         [1, 2, "2020-01-02", u"-"])
+        self.assertEqual(Point.loads_dict([1, 2, "2020-01-02", None],
+                                          env_type="json_compact"), point)
+
+        with self.assertRaises(LoadFailedError):
+            Point.loads_dict([1, 2], env_type="json_compact")
+        with self.assertRaises(MappingFailedError) as cm:
+            Point.loads_dict([1, "2", "2020-01-02", None],
+                             env_type="json_compact")
+        self.assertEqual(cm.exception.scope_name, u"y")
+
+    def test_nested_and_abstract(self):
+        drawing = Drawing(id=1, note=None, raw="r", color=3,
+                          created=datetime(2020, 1, 2), extra=None,
+                          shapes=[BinaryCircle(name=u"c", radius=1.0),
+                                  BinaryPolygon(name=u"p", points=[[1, 2]],
+                                                closed=True)])
+        compact = drawing.dumps_dict(env_type="json_compact")
+        self.assertEqual(compact[6], [["circle", u"c", 1.0],
+                                      ["polygon", True, u"p", [[1, 2]]]])
+        self.assertEqual(Drawing.loads_dict(compact, env_type="json_compact"),
+                         drawing)
+
+        text = drawing.dumps_json(compact=True)
+        self.assertLess(len(text), len(drawing.dumps_json()))
+        self.assertEqual(Drawing.loads_json(text, compact=True), drawing)
+
+        circle = BinaryCircle(name=u"c", radius=1.0)
+        self.assertEqual(BinaryShape.loads_json(circle.dumps_json(compact=True),
+                                                compact=True), circle)
+
+    def test_fingerprint(self):
+        def make(score_type):
+            class Item(AttrObject):
+                attributes = {"id": int, "score": score_type}
+            return Item
+        Item, Other = make(int), make(float)
+        self.assertEqual(Item.schema_fingerprint(), make(int).schema_fingerprint())
+        self.assertNotEqual(Item.schema_fingerprint(), Other.schema_fingerprint())
+
+        text = Item(id=1, score=2).dumps_json(compact=True)
+        self.assertEqual(make(int).loads_json(text, compact=True).score, 2)
+        with self.assertRaises(LoadFailedError):
+            Other.loads_json(text, compact=True)
+        with self.assertRaises(LoadFailedError):
+            Item.loads_json("[1, 2]", compact=True)
+
+    def test_fingerprint_after_new_subclass(self):
+        class Base(AbstractAttrObject):
+            attributes = {"id": int}
+
+        class Holder(AttrObject):
+            attributes = {"item": Base}
+
+        class First(Base):
+            pass
+
+        base, holder = Base.schema_fingerprint(), Holder.schema_fingerprint()
+        self.assertEqual(Base.schema_fingerprint(), base)
+
+        class Second(Base):
+            attributes = {"extra": int}
+
+        self.assertNotEqual(Base.schema_fingerprint(), base)
+        self.assertNotEqual(Holder.schema_fingerprint(), holder)
+
+    def test_fingerprint_without_addresses(self):
+        import re
+        def make(views_type):
+            class Page(AttrObject):
+                attributes = {
+                    "code": re.compile(u"[a-z]+"),
+                    "meta": {"views": views_type,
+                             "tags": OptionalAttr([unicode], default=lambda: [])},
+                    "version": ConstantAttr(1),
+                }
+            return Page
+        self.assertEqual(make(int).schema_fingerprint(),
+                         make(int).schema_fingerprint())
+        self.assertNotEqual(make(int).schema_fingerprint(),
+                            make(float).schema_fingerprint())
+
+        class Unstable(AttrObject):
+            attributes = {"marker": ConstantAttr(object())}
+        with self.assertRaises(TypeError):
+            Unstable.schema_fingerprint()
+
+
+class TestStreamingJSON(unittest.TestCase):
+    def _drawing(self):
+        return Drawing(id=1, note=None, raw="r", color=u"red",
+                       created=datetime(2020, 1, 2), extra={"a": [1]},
+                       shapes=[BinaryCircle(name=u"가", radius=1.0),
+                               BinaryPolygon(name=u"p", points=[[1, 2], []],
+                                             closed=True)] * 50)
+
+    def tearDown(self):
+        set_json_encoder(None)
+
+    def test_iter_dumps_json(self):
+        drawing = self._drawing()
+        chunks = list(drawing.iter_dumps_json(chunk_size=256))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads("".join(chunks)), drawing.dumps_json_dict())
+        self.assertEqual(Drawing.loads_json("".join(chunks)), drawing)
+
+    def test_dump_json(self):
+        from StringIO import StringIO
+        drawing = self._drawing()
+        fp = StringIO()
+        drawing.dump_json(fp, encoder=json.JSONEncoder(separators=(",", ":")))
+        self.assertNotIn(", ", fp.getvalue())
+        self.assertEqual(Drawing.loads_json(fp.getvalue()), drawing)
+
+    def test_error_scope(self):
+        drawing = self._drawing()
+        drawing.shapes = list(drawing.shapes)
+        drawing.shapes[3] = BinaryPolygon(name=u"p", points=[[1, 2]],
+                                          closed=True)
+        drawing.shapes[3].points[0][1] = "x"
+        with self.assertRaises(MappingFailedError) as cm:
+            list(drawing.iter_dumps_json())
+        self.assertEqual(cm.exception.scope_name, u"shapes[3].points[0][1]")
+
+    def test_set_json_encoder(self):
+        drawing = self._drawing()
+        set_json_encoder(json.JSONEncoder(separators=(",", ":"),
+                                          sort_keys=True))
+        self.assertEqual(drawing.dumps_json(),
+                         json.dumps(drawing.dumps_json_dict(),
+                                    separators=(",", ":"), sort_keys=True))
+
+        calls = []
+        def dumps(obj):
+            calls.append(obj)
+            return json.dumps(obj)
+        set_json_encoder(dumps)
+        self.assertEqual(json.loads("".join(drawing.iter_dumps_json())),
+                         drawing.dumps_json_dict())
+        self.assertTrue(calls)
+
+        set_json_encoder(None)
+        self.assertEqual(drawing.dumps_json(),
+                         json.dumps(drawing.dumps_json_dict()))
+        with self.assertRaises(TypeError):
+            set_json_encoder(3)
+
+
+class LazyAuthor(AttrObject):
+    attributes = {"name": unicode}
+
+
+class LazyComment(AttrObject):
+    attributes = {
+        "author": LazyAuthor,
+        "text": unicode,
+    }
+
+
+class LazyPost(AttrObject):
+    attributes = {
+        "id": int,
+        "comments": [LazyComment],
+        "meta": {"views": int},
+        "editor": OptionalAttr(LazyAuthor, default=None),
+    }
+
+
+class TestLazyLoading(unittest.TestCase):
+    Post = LazyPost
+
+    def _dict(self):
+        return {
+            "id": 1,
+            "comments": [{"author": {"name": u"a%d" % i}, "text": u"t"}
+                         for i in range(3)],
+            "meta": {"views": 10},
+        }
+
+    def test_lazy_equals_eager(self):
+        post = self.Post.loads_lazy(self._dict())
+        self.assertEqual(sorted(post._lazy_state[0]), ["comments", "meta"])
+        self.assertEqual(post, self.Post.loads_dict(self._dict()))
+        self.assertEqual(post._lazy_state[0], {})
+        self.assertIsNone(post.editor)
+
+    def test_materialize_on_access(self):
+        dict_ = self._dict()
+        dict_["comments"][2]["author"]["name"] = 3
+        dict_["meta"]["views"] = "many"
+        post = self.Post.loads_lazy(dict_)
+        self.assertEqual(post.id, 1)
+
+        comments = post.comments
+        self.assertEqual(comments[0].author.name, u"a0")
+        with self.assertRaises(MappingFailedError) as cm:
+            comments[2].author
+        self.assertEqual(cm.exception.scope_name, u"comments[2].author.name")
+        with self.assertRaises(MappingFailedError) as cm:
+            post.meta
+        self.assertEqual(cm.exception.scope_name, u"meta.views")
+        with self.assertRaises(MappingFailedError):
+            post.meta
+
+    def test_errors_through_dumps(self):
+        dict_ = self._dict()
+        dict_["comments"][2]["author"]["name"] = 3
+        for dump in [lambda post: post.dumps_dict(),
+                     lambda post: post.dumps_json(),
+                     lambda post: "".join(post.iter_dumps_json()),
+                     lambda post: post.comments[2].dumps_dict()]:
+            with self.assertRaises(MappingFailedError) as cm:
+                dump(self.Post.loads_lazy(dict_))
+            self.assertEqual(cm.exception.scope_name, u"comments[2].author.name")
+
+    def test_pickle(self):
+        post = self.Post.loads_lazy(self._dict())
+        state = post.__getstate__()
+        self.assertNotIn("_lazy_state", state)
+        self.assertEqual(state["comments"][1].author.name, u"a1")
+        copied = pickle.loads(pickle.dumps(self.Post.loads_lazy(self._dict()), 2))
+        self.assertNotIn("_lazy_state", copied.__dict__)
+        self.assertEqual(copied, self.Post.loads_dict(self._dict()))
+
+    def test_eager_errors(self):
+        with self.assertRaises(MappingFailedError) as cm:
+            self.Post.loads_lazy({"id": "x", "comments": [], "meta": {}})
+        self.assertEqual(cm.exception.scope_name, u"id")
+        with self.assertRaises(AttributeError):
+            self.Post.loads_lazy(self._dict()).missing
+
+    def test_hook_only_on_lazy_classes(self):
+        self.assertFalse(hasattr(AttrObject, "__getattr__"))
+        self.assertFalse(hasattr(UnicodeAttr(), "missing"))
+
+        class Fallback(AttrObject):
+            attributes = {"comments": [LazyComment]}
+
+            def __getattr__(self, name):
+                return "fallback"
+
+        dict_ = {"comments": [{"author": {"name": u"a"}, "text": u"t"}]}
+        loaded = Fallback.loads_lazy(dict_)
+        self.assertEqual(loaded.comments[0].author.name, u"a")
+        self.assertEqual(loaded.missing, "fallback")
+        self.assertNotIn("_lazy_state", loaded.__dict__)
+
+    def test_slotted_is_eager(self):
+        row = SlottedParallelRow.loads_lazy({"id": 1, "tags": [u"a"]})
+        self.assertEqual(row, SlottedParallelRow(id=1, tags=[u"a"]))
+
+
+class TestJSONLinesIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "rows.jsonl")
+        rows = [ParallelRow(id=i * 10, name=u"가%d" % i) for i in range(100)]
+        ParallelRow.dump_jsonl(rows, self.path)
+        with open(self.path, "ab") as fp:
+            fp.write("\n" + '{"id": "bad"}' + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_random_access(self):
+        self.assertEqual(ParallelRow.build_jsonl_index(self.path), 101)
+        with ParallelRow.open_jsonl_index(self.path) as records:
+            self.assertEqual(len(records), 101)
+            self.assertEqual(records[42], ParallelRow(id=420, name=u"가42"))
+            self.assertEqual(records[0].id, 0)
+            with self.assertRaises(MappingFailedError) as cm:
+                records[100]
+            self.assertEqual(cm.exception.scope_name, u"[100].id")
+            with self.assertRaises(IndexError):
+                records[101]
+            with self.assertRaises(ValueError):
+                records.get(10)
+
+    def test_key(self):
+        index_path = os.path.join(self.tmpdir, "by_id.idx")
+        ParallelRow.build_jsonl_index(self.path, key="id", index_path=index_path)
+        with ParallelRow.open_jsonl_index(self.path, index_path) as records:
+            self.assertEqual(records.get(990).name, u"가99")
+            self.assertIsNone(records.get(5))
+        with self.assertRaises(ValueError):
+            ParallelRow.build_jsonl_index(self.path, key="missing")
+
+    def test_key_errors(self):
+        with open(self.path, "ab") as fp:
+            fp.write('{"name": "no id"}\n')
+        self.assertEqual(ParallelRow.build_jsonl_index(self.path, key="id"), 102)
+        with ParallelRow.open_jsonl_index(self.path) as records:
+            self.assertEqual(records.get(10).name, u"가1")
+
+        with open(self.path, "ab") as fp:
+            fp.write('{"id": \n')
+        with self.assertRaises(LoadFailedError) as cm:
+            ParallelRow.build_jsonl_index(self.path, key="id")
+        self.assertEqual(cm.exception.lineno, 104)
+
+    def test_stale(self):
+        ParallelRow.build_jsonl_index(self.path)
+        with open(self.path, "ab") as fp:
+            fp.write('{"id": 1}\n')
+        with self.assertRaises(ValueError):
+            ParallelRow.open_jsonl_index(self.path)
+
+
+class TrackedPoint(TrackedAttrObject):
+    attributes = {"x": int, "y": int}
+
+
+class TrackedPath(TrackedAttrObject):
+    attributes = {
+        "name": unicode,
+        "points": [TrackedPoint],
+        "values": [int],
+        "when": DatetimeAttr(format=u"%Y-%m-%d"),
+    }
+
+
+class TestTracked(unittest.TestCase):
+    def _path(self):
+        return TrackedPath(name=u"p",
+                           points=[TrackedPoint(x=i, y=0) for i in range(3)],
+                           values=[1, 2, 3],
+                           when=datetime(2020, 1, 2))
+
+    def test_dumps_equal_untracked(self):
+        path = self._path()
+        dumped = path.dumps_dict()
+        self.assertEqual(dumped["points"][2], {"x": 2, "y": 0})
+        self.assertEqual(path.dumps_dict(), dumped)
+        self.assertEqual(path.dumps_json_dict()["when"], u"2020-01-02")
+        self.assertEqual(path.dumps_dict()["when"],
+                         datetime(2020, 1, 2))
+        self.assertEqual(TrackedPath.loads_dict(dumped), path)
+        self.assertEqual(TrackedPath.dumps_many([path, path]), [dumped] * 2)
+
+    def test_reuses_unchanged(self):
+        path = self._path()
+        values = path.dumps_dict()["values"]
+        self.assertIs(path.dumps_dict()["values"], values)
+        path.name = u"q"
+        path.points[0].x = 10
+        dumped = path.dumps_dict()
+        self.assertIs(dumped["values"], values)
+        self.assertEqual(dumped["name"], u"q")
+        self.assertEqual(dumped["points"][0], {"x": 10, "y": 0})
+
+        path.values.append(4)
+        self.assertEqual(path.dumps_dict()["values"], [1, 2, 3])
+        path.mark_changed("values")
+        self.assertEqual(path.dumps_dict()["values"], [1, 2, 3, 4])
+
+    def test_delta(self):
+        path = self._path()
+        self.assertEqual(path.changed_keys(),
+                         set(["name", "points", "values", "when"]))
+        self.assertEqual(path.dumps_delta(), path.dumps_dict())
+        self.assertEqual(path.dumps_delta(), {})
+        self.assertEqual(path.points[1].dumps_delta(), {})
+        path.name = u"q"
+        path.points[1].y = 5
+        self.assertEqual(path.points[1].changed_keys(), set(["y"]))
+        self.assertEqual(path.changed_keys(), set(["name", "points"]))
+        delta = path.dumps_delta("json")
+        self.assertEqual(delta, {"name": u"q",
+                                 "points": path.dumps_json_dict()["points"]})
+        self.assertEqual(delta["points"][1], {"x": 1, "y": 5})
+        self.assertEqual(path.points[1].changed_keys(), set())
+        self.assertEqual(path.dumps_delta(), {})
+
+        path.points[1].y = 6
+        self.assertEqual(path.points[1].dumps_delta(), {"y": 6})
+        self.assertEqual(path.dumps_delta(), {})
+
+    def test_errors_and_pickle(self):
+        path = self._path()
+        path.dumps_dict()
+        path.values = [1, "x"]
+        with self.assertRaises(DumpFailedError) as cm:
+            path.dumps_dict()
+        self.assertEqual(cm.exception.scope_name, u"values[1]")
+        path.values = [5]
+        copied = pickle.loads(pickle.dumps(path, 2))
+        self.assertEqual(copied, path)
+        self.assertEqual(copied.dumps_dict()["values"], [5])
+
+
+class FrozenColor(FrozenAttrObject):
+    attributes = {"name": unicode, "rgb": [int]}
+
+    def __postinit__(self):
+        self.name = self.name.lower()
+
+
+class FrozenPalette(FrozenAttrObject):
+    attributes = {
+        "colors": [FrozenColor],
+        "meta": {"version": int},
+    }
+
+
+class FrozenLabel(FrozenAttrObject):
+    attributes = {"color": TrackedPoint, "text": unicode}
+
+
+class TestFrozen(unittest.TestCase):
+    def _palette(self):
+        return FrozenPalette(colors=[FrozenColor(name=u"Red", rgb=[255, 0, 0])],
+                             meta={"version": 1})
+
+    def test_immutable(self):
+        palette = self._palette()
+        color = palette.colors[0]
+        self.assertEqual(color.name, u"red")
+        with self.assertRaises(AttributeError):
+            color.name = u"blue"
+        with self.assertRaises(AttributeError):
+            del palette.meta
+        loaded = FrozenPalette.loads_dict(palette.dumps_dict())
+        with self.assertRaises(AttributeError):
+            loaded.colors[0].rgb = []
+        lazy = FrozenPalette.loads_lazy(palette.dumps_dict())
+        self.assertEqual(lazy.colors, palette.colors)
+        with self.assertRaises(AttributeError):
+            lazy.meta = {}
+
+    def test_hash(self):
+        palette = self._palette()
+        self.assertEqual(hash(palette), hash(self._palette()))
+        self.assertEqual({palette: 1}[self._palette()], 1)
+        self.assertEqual(len(set([palette, self._palette()])), 1)
+        self.assertNotEqual(hash(FrozenColor(name=u"a", rgb=[1])),
+                            hash(FrozenColor(name=u"a", rgb=[2])))
+        self.assertFalse(palette != self._palette())
+
+        first = FrozenLabel(color=TrackedPoint(x=1, y=2), text=u"a")
+        second = FrozenLabel(color=TrackedPoint(x=1, y=2), text=u"a")
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(len(set([first, second])), 1)
+
+    def test_cached_dumps(self):
+        palette = self._palette()
+        dumped = palette.dumps_dict()
+        self.assertIs(palette.dumps_dict(), dumped)
+        self.assertIs(palette.dumps_json_dict(), palette.dumps_json_dict())
+        self.assertEqual(dumped, {"colors": [{"name": u"red", "rgb": [255, 0, 0]}],
+                                  "meta": {"version": 1}})
+        self.assertEqual(json.loads(palette.dumps_json()),
+                         palette.dumps_json_dict())
+        self.assertEqual(palette.dumps_json(), palette.dumps_json())
+        self.assertEqual(FrozenPalette.loads_json(palette.dumps_json(compact=True),
+                                                  compact=True), palette)
+
+    def test_pickle(self):
+        palette = self._palette()
+        hash(palette)
+        for protocol in (0, 2):
+            copied = pickle.loads(pickle.dumps(palette, protocol))
+            self.assertEqual(copied, palette)
+            self.assertEqual(hash(copied), hash(palette))
+            with self.assertRaises(AttributeError):
+                copied.meta = {}
+
+
+class InternedCountry(FrozenAttrObject):
+    attributes = {"code": StringChoiceAttr([u"KR", u"US"]), "name": unicode}
+
+
+class InternedRow(AttrObject):
+    attributes = {
+        "country": InternedCountry,
+        "label": OptionalAttr(FrozenLabel, default=None),
+        "tags": [unicode],
+        "kind": bytes,
+        "meta": {"source": unicode},
+        "note": OptionalAttr(unicode, default=None),
+    }
+
+
+class TestInterning(unittest.TestCase):
+    def _rows(self, n):
+        # json.loads() gives each row its own copies of the strings
+        return json.loads(json.dumps([{
+            "country": {"code": u"KR", "name": u"Korea"},
+            "tags": [u"a", u"b%d" % (i % 2)],
+            "kind": "row",
+            "meta": {"source": u"feed"},
+            "label": {"color": {"x": 1, "y": 2}, "text": u"l"},
+        } for i in range(n)]))
+
+    def test_loads_many(self):
+        plain = InternedRow.loads_many(self._rows(4))
+        rows = InternedRow.loads_many(self._rows(4), interner=True)
+        self.assertEqual(rows, plain)
+        self.assertIsNot(plain[0].tags[0], plain[1].tags[0])
+        self.assertIs(rows[0].tags[0], rows[1].tags[0])
+        self.assertIs(rows[0].tags[1], rows[2].tags[1])
+        self.assertIs(rows[0].meta["source"], rows[3].meta["source"])
+        self.assertIs(rows[0].kind, rows[1].kind)
+        self.assertIs(rows[0].country, rows[3].country)
+        self.assertIs(rows[0].label, rows[3].label)
+        self.assertIs(rows[0].country.code, InternedCountry.type_signature()[
+            "code"].choices[0])
+        self.assertIsNone(rows[0].note)
+
+    def test_shared_table(self):
+        table = InternTable()
+        first = InternedRow.loads_dict(self._rows(1)[0], interner=table)
+        second = InternedRow.loads_json(json.dumps(self._rows(1)[0]),
+                                        interner=table)
+        self.assertIs(first.country, second.country)
+        self.assertIs(first.tags[0], second.tags[0])
+        other = InternedRow.loads_dict(self._rows(1)[0], interner=True)
+        self.assertIsNot(other.country, first.country)
+
+    def test_bounded(self):
+        table = InternTable(max_size=2)
+        rows = InternedRow.loads_many(self._rows(3), interner=table)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(len(rows), 3)
+        fresh = u"".join([u"fr", u"esh"])
+        self.assertIs(table.intern(fresh), fresh)
+        self.assertIsNot(table.intern(u"".join([u"fre", u"sh"])), fresh)
+        self.assertEqual(table.intern(u"x"), u"x")
+        self.assertEqual(table.intern([1]), [1])
+        self.assertIs(type(InternTable().intern("a")), str)
+
+    def test_jsonl(self):
+        from StringIO import StringIO
+        stream = StringIO("\n".join(json.dumps(row)
+                                             for row in self._rows(3)))
+        rows = list(InternedRow.iter_loads_jsonl(stream, interner=True))
+        self.assertEqual(rows, InternedRow.loads_many(self._rows(3)))
+        self.assertIs(rows[0].country, rows[2].country)